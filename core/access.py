@@ -0,0 +1,25 @@
+from asgiref.sync import sync_to_async
+
+
+def can_view(user, obj):
+    """
+    Может ли пользователь видеть объект (Subject, Module, Lecture или Test).
+
+    Для студента это один EXISTS-запрос через Model.objects.visible_to(user);
+    ответ запоминается на объекте пользователя, т.е. на время запроса.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.role == 'admin':
+        return True
+    memo = getattr(user, '_access_memo', None)
+    if memo is None:
+        memo = user._access_memo = {}
+    key = (obj._meta.label, obj.pk)
+    if key not in memo:
+        memo[key] = type(obj).objects.visible_to(user).filter(pk=obj.pk).exists()
+    return memo[key]
+
+
+# Same memo on the user; ORM access in async views must go through a thread
+acan_view = sync_to_async(can_view)
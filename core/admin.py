@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, StudyGroup, Subject, Module, Lecture, Test, Question, Choice, TestAttempt
+from .models import User, StudyGroup, Subject, Module, Lecture, Test, Question, Choice, TestAttempt, TestResult, LectureRenderJob
 
 
 class UserAdmin(BaseUserAdmin):
@@ -28,3 +28,12 @@ admin.site.register(Question, QuestionAdmin)
 admin.site.register(Choice)
 admin.site.register(Test)
 admin.site.register(TestAttempt)
+admin.site.register(TestResult)
+
+
+class LectureRenderJobAdmin(admin.ModelAdmin):
+    list_display = ('lecture', 'status', 'created', 'finished')
+    list_filter = ('status',)
+
+
+admin.site.register(LectureRenderJob, LectureRenderJobAdmin)
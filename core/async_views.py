@@ -0,0 +1,101 @@
+"""
+Async-версии страниц, которые в основном читают (ASGI-режим, run_asgi.py).
+
+Данные берутся асинхронным ORM, чтение файлов лекций и конвертация в HTML
+идут в отдельном пуле потоков и не держат поток-обработчик. Шаблоны
+рендерятся через sync_to_async: контекстный процессор auth и ленивые
+связи в шаблонах обращаются к базе синхронно.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
+from django.urls import reverse
+
+from . import content_cache, journal, lecture_render, timetable
+from .access import acan_view
+from .models import Lecture
+from .render_queue import is_pending
+
+arender = sync_to_async(render)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_FILE_WORKERS', 4),
+                thread_name_prefix='lecture-io',
+            )
+        return _executor
+
+
+async def run_blocking(func, *args):
+    """Выполнить файловую операцию или конвертацию вне цикла событий."""
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+
+
+@login_required
+async def index(request):
+    user = await request.auser()
+    if user.role == 'admin':
+        return await arender(request, 'core/admin_dashboard.html')
+    if user.study_group_id:
+        from .models import Schedule
+        subjects = await sync_to_async(content_cache.group_tree)(user.study_group_id)
+        grid = await sync_to_async(timetable.group_grid)(user.study_group_id)
+        return await arender(request, 'core/student_dashboard.html', {
+            'subjects': subjects,
+            'grid': grid,
+            'day_choices': Schedule.DAY_CHOICES
+        })
+    return await arender(request, 'core/student_dashboard.html', {'subjects': [], 'grid': None, 'day_choices': []})
+
+
+@login_required
+async def lectures_list(request):
+    user = await request.auser()
+    lectures = [lecture async for lecture in Lecture.objects.visible_to(user).select_related('module__subject__group')]
+    return await arender(request, 'core/lectures_list.html', {'lectures': lectures})
+
+
+@login_required
+async def student_journal(request):
+    user = await request.auser()
+    if user.role != 'student':
+        return await arender(request, 'core/student_journal.html', {'error': 'Доступ запрещён'})
+
+    stats = [row async for row in journal.subject_stats(user)]
+    attempts = [attempt async for attempt in journal.recent_attempts(user)]
+    subjects_data = journal.build(stats, attempts)
+    return await arender(request, 'core/student_journal.html', {'subjects_data': subjects_data})
+
+
+@login_required
+async def lecture_detail(request, pk):
+    user = await request.auser()
+    lecture = await aget_object_or_404(Lecture, pk=pk)
+    if not await acan_view(user, lecture):
+        return await arender(request, 'core/lecture_detail.html', {'error': 'Доступ запрещён'})
+
+    # stat(), cache files and conversion all block: keep them off the loop
+    pending = is_pending(lecture)
+    if pending:
+        content = await run_blocking(lecture_render.cached_html, lecture)
+    else:
+        content = await run_blocking(lecture_render.render_lecture, lecture)
+
+    return await arender(request, 'core/lecture_detail.html', {
+        'lecture': lecture,
+        'content': content,
+        'file_url': reverse('core:lecture_file', args=[lecture.pk]),
+        'pending': pending and content is None,
+    })
@@ -0,0 +1,173 @@
+import os
+import statistics
+import tempfile
+import time
+
+import django
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from . import query_plans, synthetic
+from .grading import answer_key
+from .models import Lecture, Module, StudyGroup, Subject, Test, User
+
+SKIP_ROUTES = {'logout'}
+
+# Which seeded object fills each URL parameter
+URL_KWARGS = {
+    'subject_id': 'subject',
+    'module_id': 'module',
+    'test_id': 'test',
+    'group_id': 'group',
+    'pk': 'lecture',
+}
+
+
+def core_routes():
+    """(имя маршрута, список параметров) для всех маршрутов core/urls.py."""
+    resolver = get_resolver()
+    routes = []
+    for pattern in resolver.url_patterns:
+        if getattr(pattern, 'namespace', None) != 'core':
+            continue
+        for sub in pattern.url_patterns:
+            if sub.name and sub.name not in SKIP_ROUTES:
+                routes.append((f'core:{sub.name}', list(sub.pattern.converters)))
+    return routes
+
+
+def _fixtures(media_root):
+    group = StudyGroup.objects.order_by('id').first()
+    subject = Subject.objects.filter(group=group).order_by('id').first()
+    module = Module.objects.filter(subject=subject).order_by('id').first()
+    test = Test.objects.filter(module=module).order_by('id').first()
+    # Large limit so repeated benchmark submissions never hit it
+    Test.objects.filter(pk=test.pk).update(attempts_limit=10 ** 6)
+    test.refresh_from_db()
+
+    os.makedirs(os.path.join(media_root, 'lectures'), exist_ok=True)
+    with open(os.path.join(media_root, 'lectures', 'bench.md'), 'w', encoding='utf-8') as f:
+        f.write('# Лекция\n\n' + 'Текст лекции. ' * 2000)
+    lecture = Lecture.objects.create(title='Benchmark', module=module, file='lectures/bench.md')
+    lecture.assigned_groups.add(group)
+
+    admin = User.objects.create_user(username='bench-admin', password='x', role='admin', is_staff=True)
+    student = User.objects.filter(study_group=group, role='student').order_by('id').first()
+    return {
+        'group': group, 'subject': subject, 'module': module, 'test': test, 'lecture': lecture,
+        'users': {'admin': admin, 'student': student},
+    }
+
+
+def _measure(client, method, url, data, repeat):
+    runs = []
+    for _ in range(repeat + 1):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = client.post(url, data) if method == 'POST' else client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = (time.perf_counter() - start) * 1000
+        runs.append((len(ctx), elapsed, len(body), response.status_code))
+    cold, warm = runs[0], runs[1:]
+    return {
+        'status': warm[-1][3],
+        'queries_cold': cold[0],
+        'queries': max(r[0] for r in warm),
+        'ms_cold': round(cold[1], 3),
+        'ms': round(statistics.median(r[1] for r in warm), 3),
+        'bytes': warm[-1][2],
+    }
+
+
+def run(sizes, repeat=3, seed=0):
+    """
+    Засеять временную тестовую БД и замерить все маршруты core.
+
+    Каждый маршрут вызывается от имени администратора и студента; для
+    take_test дополнительно замеряется отправка ответов (POST). Для горячих
+    запросов сохраняется EXPLAIN QUERY PLAN.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    media_root = tempfile.mkdtemp(prefix='mik-edu-bench-')
+    try:
+        with override_settings(
+            MEDIA_ROOT=media_root,
+            LECTURE_RENDER_CACHE_DIR=os.path.join(media_root, 'cache'),
+            LECTURE_RENDER_ASYNC=False,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}},
+        ):
+            started = time.perf_counter()
+            counts = synthetic.generate(seed=seed, **sizes)
+            seed_seconds = time.perf_counter() - started
+            objects = _fixtures(media_root)
+            plans = query_plans.collect(
+                objects['users']['student'], objects['test'], objects['subject'], objects['group']
+            )
+            results = _run_routes(objects, repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'sizes': sizes,
+            'counts': counts,
+            'seed': seed,
+            'repeat': repeat,
+            'seed_seconds': round(seed_seconds, 3),
+        },
+        'results': results,
+        'plans': plans,
+    }
+
+
+def _run_routes(objects, repeat):
+    key = answer_key(objects['test'])
+    submission = {
+        f'question_{question_id}': min(correct) if correct else ''
+        for question_id, (_, correct) in key.items()
+    }
+
+    results = {}
+    for role, user in objects['users'].items():
+        client = Client()
+        for name, params in core_routes():
+            kwargs = {param: objects[URL_KWARGS[param]].pk for param in params}
+            url = reverse(name, kwargs=kwargs)
+            if name == 'core:login':
+                results[f'{name} [anonymous]'] = _measure(Client(), 'GET', url, None, repeat)
+                continue
+            client.force_login(user)
+            results[f'{name} [{role}]'] = _measure(client, 'GET', url, None, repeat)
+            if name == 'core:take_test' and role == 'student':
+                results[f'{name} POST [{role}]'] = _measure(client, 'POST', url, submission, repeat)
+    return results
+
+
+def check(report, max_queries=None, max_ms=None, baseline=None, time_tolerance=0.5):
+    """Список нарушений порогов (пустой, если всё в норме)."""
+    failures = []
+    previous = (baseline or {}).get('results', {})
+    for route, row in sorted(report['results'].items()):
+        if row['status'] >= 500:
+            failures.append(f'{route}: HTTP {row["status"]}')
+        if max_queries is not None and row['queries'] > max_queries:
+            failures.append(f'{route}: {row["queries"]} queries > {max_queries}')
+        if max_ms is not None and row['ms'] > max_ms:
+            failures.append(f'{route}: {row["ms"]:.1f} ms > {max_ms} ms')
+        old = previous.get(route)
+        if old:
+            if row['queries'] > old['queries']:
+                failures.append(f'{route}: queries {old["queries"]} -> {row["queries"]}')
+            if row['ms'] > old['ms'] * (1 + time_tolerance) and row['ms'] - old['ms'] > 1:
+                failures.append(f'{route}: {old["ms"]:.1f} ms -> {row["ms"]:.1f} ms')
+    for name, row in sorted(report.get('plans', {}).items()):
+        if row['table_scans']:
+            failures.append(f'{name}: full table scan of {", ".join(row["table_scans"])}')
+    return failures
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from .db import sqlite_pragmas
+
+SLOW_SESSION_ENGINES = {'django.contrib.sessions.backends.db'}
+
+# Caches that are not shared between processes
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def _template_loaders():
+    options = settings.TEMPLATES[0].get('OPTIONS', {}) if settings.TEMPLATES else {}
+    loaders = options.get('loaders')
+    if loaders is None:
+        # Django wraps the default loaders in the cached loader itself
+        return 'cached (default)', True
+    names = [loader[0] if isinstance(loader, (list, tuple)) else loader for loader in loaders]
+    return ', '.join(names), 'django.template.loaders.cached.Loader' in names
+
+
+def performance_report():
+    """[(параметр, значение, ок)] — какие настройки производительности включены."""
+    db = settings.DATABASES['default']
+    cache = settings.CACHES['default']['BACKEND'].rsplit('.', 2)[-2]
+    loaders, cached_templates = _template_loaders()
+    rows = [
+        ('DEBUG', settings.DEBUG, not settings.DEBUG),
+        ('Template loaders', loaders, cached_templates),
+        ('Cache backend', cache, cache != 'dummy'),
+        ('Session engine', settings.SESSION_ENGINE.rsplit('.', 1)[-1],
+         settings.SESSION_ENGINE not in SLOW_SESSION_ENGINES),
+        ('CONN_MAX_AGE', db.get('CONN_MAX_AGE', 0), bool(db.get('CONN_MAX_AGE'))),
+    ]
+    if db['ENGINE'] == 'django.db.backends.sqlite3':
+        tuning = getattr(settings, 'SQLITE_TUNING', True)
+        pragmas = sqlite_pragmas()
+        rows.append(('SQLite PRAGMAs', ', '.join(f'{k}={v}' for k, v in pragmas.items()) if tuning else 'off', tuning))
+    background = getattr(settings, 'LECTURE_RENDER_ASYNC', False)
+    workers = getattr(settings, 'LECTURE_RENDER_WORKERS', 0) if background else 'inline'
+    rows.append(('Lecture render workers', workers, background))
+    rows.append(('Lecture file offload', getattr(settings, 'LECTURE_FILE_SENDFILE', None) or 'django', True))
+    return rows
+
+
+def format_report(rows):
+    width = max(len(name) for name, _, _ in rows)
+    return '\n'.join(f"{'ok ' if ok else '!! '} {name:<{width}}  {value}" for name, value, ok in rows)
+
+
+@register('performance', deploy=True)
+def check_performance(app_configs, **kwargs):
+    """Предупреждения check --deploy о медленных настройках."""
+    return [
+        Warning(f'{name} = {value}', hint='See mik_edu/settings_prod.py', id='core.W001')
+        for name, value, ok in performance_report()
+        if not ok
+    ]
+
+
+@register('caches')
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш в памяти процесса при нескольких процессах отдаёт устаревшее содержимое."""
+    workers = getattr(settings, 'SERVER_WORKERS', 1)
+    backend = settings.CACHES['default']['BACKEND']
+    if workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'{backend} is per process, but SERVER_WORKERS = {workers}',
+            hint='Use a shared cache (FileBasedCache: unset DJANGO_CACHE) or run a single worker',
+            id='core.E001',
+        )]
+    return []
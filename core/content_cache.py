@@ -0,0 +1,161 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Lecture, Module, Schedule, StudyGroup, Subject, Test
+
+TREE = 'tree'
+SCHEDULE = 'schedule'
+
+# Pseudo-group for values computed across all groups (room conflicts);
+# bumping a group of an aggregated kind bumps it too
+ALL_GROUPS = 'all'
+AGGREGATED = {SCHEDULE}
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Path from each cached model to the group whose cache it belongs to
+GROUP_LOOKUPS = {
+    StudyGroup: 'pk',
+    Subject: 'group_id',
+    Module: 'subject__group_id',
+    Lecture: 'module__subject__group_id',
+    Test: 'module__subject__group_id',
+    Schedule: 'group_id',
+}
+
+# Which per-group cache a change of each model invalidates
+KINDS = {
+    StudyGroup: TREE,
+    Subject: TREE,
+    Module: TREE,
+    Lecture: TREE,
+    Test: TREE,
+    Schedule: SCHEDULE,
+}
+
+
+def _version_key(kind, group_id):
+    return f'content-cache:{kind}:version:{group_id}'
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def version(kind, group_id):
+    """Текущая версия кэша группы; пропавшая версия заменяется новой."""
+    key = _version_key(kind, group_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _new_version(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump(kind, *group_ids):
+    """Сменить версию кэша групп: старые записи просто перестают читаться."""
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if group_ids and kind in AGGREGATED:
+        group_ids.add(ALL_GROUPS)
+    for group_id in group_ids:
+        # A fresh random value rather than incr(): FileBasedCache.incr is a
+        # get + set, so concurrent bumps could lose a step or write an older
+        # number back. Whichever set lands last, its value was never handed
+        # out before, so nothing cached under it predates the commit.
+        cache.set(_version_key(kind, group_id), _new_version(), None)
+
+
+def invalidate(kind, *group_ids):
+    """bump() после коммита, чтобы кэш не пересобрали из незакоммиченных данных."""
+    transaction.on_commit(lambda: bump(kind, *group_ids))
+
+
+def stored_group(model, pk):
+    """Группа объекта по данным в базе (до изменения)."""
+    return model.objects.filter(pk=pk).values_list(GROUP_LOOKUPS[model], flat=True).first()
+
+
+def group_of(instance):
+    """Группа объекта по текущим значениям его полей."""
+    if isinstance(instance, StudyGroup):
+        return instance.pk
+    if isinstance(instance, (Subject, Schedule)):
+        return instance.group_id
+    if isinstance(instance, Module):
+        return stored_group(Subject, instance.subject_id) if instance.subject_id else None
+    return stored_group(Module, instance.module_id)
+
+
+def cached(kind, group_id, build, name=''):
+    """Значение build(group_id) из кэша текущей версии группы (name различает значения одного вида)."""
+    key = f'content-cache:{kind}{name}:{group_id}:{version(kind, group_id)}'
+    value = cache.get(key)
+    if value is None:
+        value = build(group_id)
+        cache.set(key, value, CACHE_TIMEOUT)
+    return value
+
+
+def _build_tree(group_id):
+    lectures = Lecture.objects.order_by('id').prefetch_related(
+        Prefetch('assigned_groups', queryset=StudyGroup.objects.only('id'))
+    )
+    modules = Module.objects.order_by('id').prefetch_related(
+        Prefetch('lectures', queryset=lectures),
+        Prefetch('tests', queryset=Test.objects.order_by('id')),
+    )
+    return list(
+        Subject.objects.filter(group_id=group_id)
+        .order_by('id')
+        .prefetch_related(Prefetch('modules', queryset=modules))
+    )
+
+
+def _build_schedule(group_id):
+    return list(Schedule.objects.filter(group_id=group_id).order_by('day_of_week', 'time'))
+
+
+def group_tree(group_id):
+    """
+    Предметы группы с модулями, лекциями (и их группами) и тестами.
+
+    Дерево строится пятью запросами и кэшируется по (группа, версия);
+    версию меняют сигналы при любом изменении содержимого группы.
+    """
+    return cached(TREE, group_id, _build_tree)
+
+
+def group_schedule(group_id):
+    """Недельное расписание группы из кэша."""
+    return cached(SCHEDULE, group_id, _build_schedule)
+
+
+def subject_modules(subject):
+    """Модули предмета из дерева его группы."""
+    for tree_subject in group_tree(subject.group_id):
+        if tree_subject.pk == subject.pk:
+            return list(tree_subject.modules.all())
+    return []
+
+
+def module_content(module, user):
+    """(лекции, тесты) модуля из дерева группы; студенту — только лекции его группы."""
+    if module.subject is None:
+        # Not part of any group tree
+        lectures = Lecture.objects.visible_to(user).filter(module=module)
+        return list(lectures), list(Test.objects.visible_to(user).filter(module=module))
+    for subject in group_tree(module.subject.group_id):
+        for tree_module in subject.modules.all():
+            if tree_module.pk != module.pk:
+                continue
+            lectures = list(tree_module.lectures.all())
+            if user.role != 'admin':
+                lectures = [
+                    lecture for lecture in lectures
+                    if any(group.pk == user.study_group_id for group in lecture.assigned_groups.all())
+                ]
+            return lectures, list(tree_module.tests.all())
+    return [], []
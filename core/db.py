@@ -0,0 +1,72 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers no longer block the writer (and vice versa)
+    'journal_mode': 'WAL',
+    # Safe with WAL: only the last transactions can be lost on power failure
+    'synchronous': 'NORMAL',
+    # Wait for a competing writer instead of failing with "database is locked"
+    'busy_timeout': 20000,
+    # Negative value is KiB: ~64 MB page cache per connection
+    'cache_size': -65536,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+_write_lock = threading.RLock()
+
+
+def sqlite_pragmas():
+    return {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Выставить PRAGMA для каждого нового SQLite-соединения."""
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_TUNING', True):
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='core.db.configure_sqlite')
+
+
+@contextmanager
+def serialized_write(using='default'):
+    """
+    Транзакция записи, сериализованная внутри процесса.
+
+    SQLite допускает одного писателя; потоки Waitress, пишущие одновременно,
+    выстраиваются в очередь на блокировке процесса вместо опроса файла БД
+    по busy_timeout. Внешняя транзакция открывается как BEGIN IMMEDIATE:
+    блокировка записи берётся сразу (с ожиданием по busy_timeout против
+    других процессов), и чтение внутри не упирается в SQLITE_BUSY при
+    переходе к записи. Остальные atomic() остаются DEFERRED. Для других
+    СУБД это обычный transaction.atomic().
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        with transaction.atomic(using=using):
+            yield
+    elif connection.in_atomic_block:
+        # BEGIN already happened in the caller's transaction
+        with _write_lock, transaction.atomic(using=using):
+            yield
+    else:
+        with _write_lock:
+            # transaction_mode is re-read from OPTIONS on every connect
+            connection.ensure_connection()
+            mode = connection.transaction_mode
+            connection.transaction_mode = 'IMMEDIATE'
+            try:
+                with transaction.atomic(using=using):
+                    connection.transaction_mode = mode
+                    yield
+            finally:
+                connection.transaction_mode = mode
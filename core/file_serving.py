@@ -0,0 +1,111 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """(start, end) включительно для одного диапазона, 'invalid' для неудовлетворимого, None — отдать файл целиком."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multi-range or malformed headers: fall back to the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            # No byte of an empty file can satisfy a suffix range
+            return 'invalid'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return 'invalid'
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith('W/'):
+        return value == etag
+    since = parse_http_date_safe(value)
+    return since is not None and int(mtime) <= since
+
+
+def _read_range(path, start, length, block_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, name):
+    """
+    Отдать файл с поддержкой ETag/If-Modified-Since и HTTP Range.
+
+    name — путь относительно MEDIA_ROOT; используется для X-Accel-Redirect,
+    если LECTURE_FILE_SENDFILE включает отдачу файла фронтовым прокси.
+    """
+    st = os.stat(path)
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if response is None:
+        mode = getattr(settings, 'LECTURE_FILE_SENDFILE', None)
+        if mode == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, 'LECTURE_FILE_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name.replace(os.sep, '/'))
+        elif mode == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = path
+        else:
+            response = _file_response(request, path, st, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(st.st_mtime)
+    patch_cache_control(response, private=True, max_age=0)
+    return response
+
+
+def _file_response(request, path, st, etag, content_type):
+    size = st.st_size
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, st.st_mtime):
+        byte_range = _parse_range(request.META['HTTP_RANGE'], size)
+
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(path, start, length, FileResponse.block_size),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,47 @@
+from .models import Test, TestResult, User
+
+
+def subject_gradebook(subject):
+    """
+    Матрица «студент × тест» по предмету.
+
+    Лучший балл, число попыток и время последней попытки для всех ячеек
+    берутся одним запросом к сводной таблице TestResult, поэтому число
+    запросов не зависит от количества студентов, тестов и попыток.
+    Возвращает (tests, rows), где rows — список словарей
+    {'student': User, 'scores': {test_id: {...}}}.
+    """
+    tests = list(
+        Test.objects.filter(module__subject=subject)
+        .select_related('module')
+        .order_by('module__name', 'name')
+        .distinct()
+    )
+
+    cells = {}
+    results = TestResult.objects.filter(
+        test__module__subject=subject, user__role='student', attempts__gt=0
+    ).only('user', 'test', 'attempts', 'best_score', 'last_attempt_at')
+    for result in results:
+        cells[(result.user_id, result.test_id)] = result
+
+    students = (
+        User.objects.filter(test_results__test__module__subject=subject, role='student')
+        .select_related('study_group')
+        .distinct()
+        .order_by('first_name', 'last_name')
+    )
+
+    rows = []
+    for student in students:
+        scores = {}
+        for test in tests:
+            cell = cells.get((student.id, test.id))
+            scores[test.id] = {
+                'test': test,
+                'score': cell.best_score if cell else None,
+                'attempts': cell.attempts if cell else 0,
+                'last_attempt': cell.last_attempt_at if cell else None,
+            }
+        rows.append({'student': student, 'scores': scores})
+    return tests, rows
@@ -0,0 +1,100 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import TestResult
+
+try:
+    import openpyxl
+except Exception:
+    openpyxl = None
+
+FORMATS = ('csv', 'xlsx')
+CHUNK_SIZE = 2000
+
+HEADER = [
+    'Группа', 'Предмет', 'Логин', 'Фамилия', 'Имя', 'Модуль', 'Тест',
+    'Попыток', 'Лучший балл', 'Средний балл', 'Последний балл', 'Последняя попытка',
+]
+
+FIELDS = (
+    'test__module__subject__group__name', 'test__module__subject__name',
+    'user__username', 'user__last_name', 'user__first_name',
+    'test__module__name', 'test__name',
+    'attempts', 'best_score', 'score_sum', 'last_score', 'last_attempt_at',
+)
+
+
+def result_rows(group=None, subject=None):
+    """
+    Строки журнала (по одной на студента и тест) из сводной таблицы TestResult.
+
+    Читаются курсором пачками по CHUNK_SIZE, поэтому память не зависит от
+    размера выгрузки. Без group и subject — все группы.
+    """
+    results = TestResult.objects.filter(user__role='student', attempts__gt=0)
+    if subject is not None:
+        results = results.filter(test__module__subject=subject)
+    elif group is not None:
+        results = results.filter(test__module__subject__group=group)
+    results = results.order_by(
+        'test__module__subject__group__name', 'test__module__subject__name',
+        'user__last_name', 'user__first_name', 'user_id',
+        'test__module__name', 'test__name', 'test_id',
+    ).values_list(*FIELDS)
+    for (group_name, subject_name, username, last_name, first_name, module_name, test_name,
+         attempts, best, total, last, last_at) in results.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            group_name or '', subject_name, username, last_name, first_name, module_name or '', test_name,
+            attempts, round(best, 1), round(total / attempts, 1), round(last, 1),
+            timezone.localtime(last_at).replace(tzinfo=None) if last_at else None,
+        ]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_stream(rows):
+    writer = csv.writer(_Echo(), delimiter=';')
+    # BOM and ';' so Excel with a Russian locale opens the file as is
+    yield '\ufeff' + writer.writerow(HEADER)
+    for row in rows:
+        if row[-1] is not None:
+            row[-1] = row[-1].strftime('%Y-%m-%d %H:%M')
+        yield writer.writerow(row)
+
+
+def export_response(fmt, filename, group=None, subject=None):
+    """
+    StreamingHttpResponse (CSV) или FileResponse из временного файла (XLSX).
+
+    Потоковая только CSV-выгрузка: книга XLSX — zip-архив, её нельзя отдавать
+    по мере чтения строк, поэтому она целиком пишется во временный файл (на
+    диск, не в память) до начала ответа.
+    """
+    rows = result_rows(group=group, subject=subject)
+    if fmt == 'xlsx':
+        if openpyxl is None:
+            raise RuntimeError('Для выгрузки XLSX установите openpyxl')
+        # Write-only workbooks keep rows on disk, not in memory
+        book = openpyxl.Workbook(write_only=True)
+        sheet = book.create_sheet('Журнал')
+        sheet.append(HEADER)
+        for row in rows:
+            sheet.append(row)
+        output = tempfile.TemporaryFile()
+        book.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    response = StreamingHttpResponse(_csv_stream(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Question, Test
+
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+def bump_test_version(**filters):
+    """Увеличить content_version тестов (сбрасывает кэши, зависящие от вопросов)."""
+    Test.objects.filter(**filters).update(content_version=F('content_version') + 1)
+
+
+def answer_key(test):
+    """
+    Ключ ответов теста: {question_id: (все варианты, правильные варианты)}.
+
+    Строится одним запросом и кэшируется по (id теста, content_version),
+    поэтому при изменении вопросов старый ключ просто перестаёт использоваться.
+    """
+    cache_key = f'grading:answer-key:{test.id}:{test.content_version}'
+    key = cache.get(cache_key)
+    if key is None:
+        choices = {}
+        correct = {}
+        rows = (
+            Question.objects.filter(test=test)
+            .order_by('id', 'choices__id')
+            .values_list('id', 'choices__id', 'choices__correct')
+        )
+        for question_id, choice_id, is_correct in rows:
+            choices.setdefault(question_id, set())
+            correct.setdefault(question_id, set())
+            if choice_id is not None:
+                choices[question_id].add(choice_id)
+                if is_correct:
+                    correct[question_id].add(choice_id)
+        key = {
+            question_id: (frozenset(choices[question_id]), frozenset(correct[question_id]))
+            for question_id in choices
+        }
+        cache.set(cache_key, key, ANSWER_KEY_TIMEOUT)
+    return key
+
+
+def grade_submission(test, data):
+    """
+    Оценить ответы из POST-данных вида question_<id>=<choice_id>.
+
+    Выбранный вариант засчитывается, только если он принадлежит своему
+    вопросу. Возвращает словарь с баллом (0-100), числом правильных ответов,
+    числом вопросов и разбором по вопросам для сохранения в попытке.
+    """
+    key = answer_key(test)
+    correct_total = 0
+    answers = {}
+    for question_id, (choice_ids, correct_ids) in key.items():
+        try:
+            choice_id = int(data.get(f'question_{question_id}'))
+        except (TypeError, ValueError):
+            choice_id = None
+        if choice_id not in choice_ids:
+            choice_id = None
+        is_correct = choice_id in correct_ids
+        if is_correct:
+            correct_total += 1
+        answers[str(question_id)] = {'choice': choice_id, 'correct': is_correct}
+    total = len(key)
+    return {
+        'score': (correct_total / total) * 100 if total else 0,
+        'correct': correct_total,
+        'total': total,
+        'answers': answers,
+    }
@@ -0,0 +1,257 @@
+"""
+Анализ заданий теста по истории попыток.
+
+Для каждого вопроса считаются трудность (p — доля правильных ответов),
+различающая способность (точечно-бисериальная корреляция с числом верных
+ответов в попытке и она же без самого вопроса — item-rest) и доли выбора
+каждого варианта. Попытки разбираются пачками в матрицу ответов NumPy
+(попытки × вопросы), в TestItemStats копятся только суммы, поэтому новые
+попытки досчитываются без пересмотра старых. Ответы оцениваются по текущему
+ключу: после смены content_version суммы пересчитываются с нуля.
+Удалённые попытки из сумм не вычитаются — для этого есть refresh(full=True).
+
+Досчитывает refresh(): команда item_analysis по расписанию или кнопка
+пересчёта на странице; сама страница (report) только читает сохранённое.
+
+Новые попытки ищутся по id > last_attempt_id. Это верно, пока попытки
+становятся видны в порядке id, как на SQLite, где записи идут по одной
+(serialized_write). На PostgreSQL/MySQL транзакция с меньшим id может
+закоммититься после уже учтённой большей, и её попытка будет пропущена
+до следующего refresh(full=True).
+"""
+from itertools import islice
+
+from .db import serialized_write
+from .grading import answer_key
+from .models import TestAttempt, TestItemStats
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+BATCH_SIZE = 5000
+
+# Per-question sums kept between runs
+QUESTION_SUMS = ('n', 'n1', 'sx', 'sx2', 'sx1', 'blank')
+
+# Thresholds for the hints on the analysis page
+MIN_RESPONSES = 10
+EASY = 0.9
+HARD = 0.2
+WEAK_DISCRIMINATION = 0.2
+RARE_DISTRACTOR = 0.05
+
+
+def _layout(test):
+    """Столбцы матрицы по текущему ключу теста: вопросы и варианты по возрастанию id."""
+    key = answer_key(test)
+    questions = sorted(key)
+    choices, choice_question, choice_correct = [], [], []
+    for column, question_id in enumerate(questions):
+        choice_ids, correct_ids = key[question_id]
+        for choice_id in sorted(choice_ids):
+            choices.append(choice_id)
+            choice_question.append(column)
+            choice_correct.append(choice_id in correct_ids)
+    return {
+        'questions': questions,
+        'choices': choices,
+        'choice_question': choice_question,
+        'choice_correct': choice_correct,
+    }
+
+
+def _empty(layout):
+    data = dict(layout)
+    for name in QUESTION_SUMS:
+        data[name] = [0] * len(layout['questions'])
+    data['picked'] = [0] * len(layout['choices'])
+    return data
+
+
+def _batch_sums(data, rows):
+    """Суммы по пачке попыток (список словарей answers)."""
+    question_index = {str(question_id): column for column, question_id in enumerate(data['questions'])}
+    choice_index = {choice_id: index for index, choice_id in enumerate(data['choices'])}
+    choice_question = data['choice_question']
+
+    present = np.zeros((len(rows), len(question_index)), dtype=bool)
+    chosen = np.full(present.shape, -1, dtype=np.int64)
+    for row, answers in enumerate(rows):
+        for question_id, answer in (answers or {}).items():
+            column = question_index.get(question_id)
+            if column is None:
+                continue
+            present[row, column] = True
+            choice = choice_index.get(answer.get('choice')) if isinstance(answer, dict) else None
+            if choice is not None and choice_question[choice] == column:
+                chosen[row, column] = choice
+
+    answered = chosen >= 0
+    # -1 (no answer) picks the trailing False
+    correct = np.append(np.array(data['choice_correct'], dtype=bool), False)[chosen]
+    totals = correct.sum(axis=1, dtype=np.int64)
+    present_int = present.astype(np.int64)
+    correct_int = correct.astype(np.int64)
+    return {
+        'n': present_int.sum(axis=0),
+        'n1': correct_int.sum(axis=0),
+        'sx': totals @ present_int,
+        'sx2': (totals * totals) @ present_int,
+        'sx1': totals @ correct_int,
+        'blank': (present & ~answered).sum(axis=0),
+        'picked': np.bincount(chosen[answered], minlength=len(choice_index)),
+    }
+
+
+def _accumulate(test, data, after):
+    """Добавить к data попытки теста с id > after; возвращает (число попыток, последний id)."""
+    rows = (
+        TestAttempt.objects.filter(test=test, id__gt=after)
+        .order_by('id')
+        .values_list('id', 'answers')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    count, last_id = 0, after
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        sums = _batch_sums(data, [answers for _, answers in batch])
+        for name, values in sums.items():
+            data[name] = (np.array(data[name], dtype=np.int64) + values).tolist()
+        count += len(batch)
+        last_id = batch[-1][0]
+    return count, last_id
+
+
+def _state(stats):
+    return None if stats is None else (stats.last_attempt_id, stats.content_version)
+
+
+def refresh(test, full=False, retries=3):
+    """
+    Досчитать статистику теста по новым попыткам и вернуть TestItemStats.
+
+    Попытки читаются вне транзакции записи; сохраняется результат, только
+    если за это время строку никто не обновил, иначе расчёт повторяется.
+    """
+    if np is None:
+        raise RuntimeError('numpy is not installed: pip install numpy')
+    for _ in range(retries):
+        stats = TestItemStats.objects.filter(test=test).first()
+        fresh = full or stats is None or stats.content_version != test.content_version
+        if fresh:
+            data, after, attempts = _empty(_layout(test)), 0, 0
+        else:
+            data, after, attempts = stats.data, stats.last_attempt_id, stats.attempts
+        count, last_id = _accumulate(test, data, after)
+        if not count and not fresh:
+            return stats
+
+        with serialized_write():
+            current = TestItemStats.objects.select_for_update().filter(test=test).first()
+            if _state(current) != _state(stats):
+                continue
+            stats, _ = TestItemStats.objects.update_or_create(test=test, defaults={
+                'content_version': test.content_version,
+                'last_attempt_id': last_id,
+                'attempts': attempts + count,
+                'data': data,
+            })
+        return stats
+    return TestItemStats.objects.get(test=test)
+
+
+def _number(value, digits=3):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _measures(data):
+    """p, точечно-бисериальная и item-rest корреляции по накопленным суммам."""
+    n, n1, sx, sx2, sx1 = (np.array(data[name], dtype=float) for name in ('n', 'n1', 'sx', 'sx2', 'sx1'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = n1 / n
+        odds = np.sqrt(p / (1 - p))
+        # Total = correct answers in the attempt
+        mean = sx / n
+        sd = np.sqrt(np.maximum(sx2 / n - mean ** 2, 0))
+        point_biserial = (sx1 / n1 - mean) / sd * odds
+        # Rest = total without this question: x - i, with i * i = i and x * i summed in sx1
+        rest_mean = (sx - n1) / n
+        rest_sd = np.sqrt(np.maximum((sx2 - 2 * sx1 + n1) / n - rest_mean ** 2, 0))
+        item_rest = ((sx1 - n1) / n1 - rest_mean) / rest_sd * odds
+    # Zero spread gives inf/nan: the index is undefined there
+    point_biserial[~np.isfinite(point_biserial)] = np.nan
+    item_rest[~np.isfinite(item_rest)] = np.nan
+    return p, point_biserial, item_rest
+
+
+def _flags(n, p, discrimination, choices):
+    if n < MIN_RESPONSES:
+        return []
+    flags = []
+    if p is not None and p > EASY:
+        flags.append('Слишком лёгкий')
+    if p is not None and p < HARD:
+        flags.append('Слишком трудный')
+    if discrimination is not None and discrimination < 0:
+        flags.append('Сильные студенты ошибаются чаще слабых')
+    elif discrimination is not None and discrimination < WEAK_DISCRIMINATION:
+        flags.append('Слабо различает студентов')
+    best = max((choice['count'] for choice in choices if choice['correct']), default=0)
+    if any(not choice['correct'] and choice['count'] > best for choice in choices):
+        flags.append('Неверный вариант выбирают чаще верного')
+    return flags
+
+
+def report(test):
+    """
+    Сохранённая статистика по вопросам теста для страницы анализа (без пересчёта).
+
+    Возвращает (stats, строки): строка — вопрос, n, p, индексы различения,
+    доля пропусков, варианты с долями выбора (в процентах) и подсказки.
+    Если статистика ещё не считалась — (None, []).
+    """
+    stats = TestItemStats.objects.filter(test=test).first()
+    if stats is None:
+        return None, []
+    data = stats.data
+    p, point_biserial, item_rest = _measures(data)
+    questions = {question.pk: question for question in test.questions.prefetch_related('choices')}
+
+    choices_by_column = {}
+    for index, choice_id in enumerate(data['choices']):
+        choices_by_column.setdefault(data['choice_question'][index], []).append(index)
+
+    rows = []
+    for column, question_id in enumerate(data['questions']):
+        question = questions.get(question_id)
+        if question is None:
+            continue
+        texts = {choice.pk: choice.text for choice in question.choices.all()}
+        n = data['n'][column]
+        choices = []
+        for index in choices_by_column.get(column, []):
+            count = data['picked'][index]
+            choices.append({
+                'text': texts.get(data['choices'][index], ''),
+                'correct': data['choice_correct'][index],
+                'count': count,
+                'rate': count * 100 / n if n else None,
+                'rare': bool(n >= MIN_RESPONSES and not data['choice_correct'][index] and count < RARE_DISTRACTOR * n),
+            })
+        row = {
+            'question': question,
+            'n': n,
+            'p': _number(p[column]),
+            'point_biserial': _number(point_biserial[column]),
+            'discrimination': _number(item_rest[column]),
+            'blank': data['blank'][column],
+            'blank_rate': data['blank'][column] * 100 / n if n else None,
+            'choices': choices,
+        }
+        row['flags'] = _flags(n, row['p'], row['discrimination'], choices)
+        rows.append(row)
+    return stats, rows
@@ -0,0 +1,87 @@
+from django.db.models import F, FloatField, Max, Q, Sum, Window
+from django.db.models.functions import RowNumber
+
+from .models import TestAttempt, TestResult
+
+# Latest attempts shown per subject on the journal page
+PREVIEW_SIZE = 10
+# Attempts per page of a subject's full history
+HISTORY_PAGE_SIZE = 50
+
+
+def subject_stats(user):
+    """
+    Итоги студента по предметам одним агрегирующим запросом к TestResult:
+    число попыток, средний и лучший балл. Последние активные — первыми.
+    """
+    return (
+        TestResult.objects.filter(user=user, attempts__gt=0, test__module__subject__isnull=False)
+        .values(subject_id=F('test__module__subject_id'), subject_name=F('test__module__subject__name'))
+        .annotate(
+            count=Sum('attempts'),
+            average=Sum('score_sum', output_field=FloatField()) / Sum('attempts'),
+            max_score=Max('best_score'),
+            last_attempt_at=Max('last_attempt_at'),
+        )
+        .order_by('-last_attempt_at', 'subject_id')
+    )
+
+
+def recent_attempts(user, limit=PREVIEW_SIZE):
+    """Последние limit попыток по каждому предмету (ROW_NUMBER() в одном запросе)."""
+    return (
+        TestAttempt.objects.filter(user=user, test__module__subject__isnull=False)
+        .select_related('test__module')
+        .annotate(row=Window(
+            RowNumber(),
+            partition_by=F('test__module__subject_id'),
+            order_by=[F('created').desc(), F('id').desc()],
+        ))
+        .filter(row__lte=limit)
+        .order_by('-created', '-id')
+    )
+
+
+def build(stats, attempts):
+    """Строки журнала: итоги предмета и его последние попытки."""
+    subjects = {}
+    for row in stats:
+        subjects[row['subject_id']] = {
+            'subject': {'id': row['subject_id'], 'name': row['subject_name']},
+            'count': row['count'],
+            'average': row['average'] or 0,
+            'max_score': row['max_score'],
+            'attempts': [],
+        }
+    for attempt in attempts:
+        data = subjects.get(attempt.test.module.subject_id)
+        if data is not None:
+            data['attempts'].append(attempt)
+    for data in subjects.values():
+        data['more'] = data['count'] > len(data['attempts'])
+    return list(subjects.values())
+
+
+def student_subjects(user):
+    """Журнал студента двумя запросами; в память загружаются только последние попытки."""
+    return build(subject_stats(user), recent_attempts(user))
+
+
+def subject_history(user, subject_id, after=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Страница истории попыток по предмету, новые — первыми.
+
+    Keyset-пагинация по (created, id): after — id последней попытки
+    предыдущей страницы. Возвращает (attempts, есть_ещё).
+    """
+    attempts = (
+        TestAttempt.objects.filter(user=user, test__module__subject_id=subject_id)
+        .select_related('test__module')
+        .order_by('-created', '-id')
+    )
+    if after is not None:
+        last = TestAttempt.objects.filter(user=user, pk=after).values_list('created', flat=True).first()
+        if last is not None:
+            attempts = attempts.filter(Q(created__lt=last) | Q(created=last, id__lt=after))
+    page = list(attempts[:limit + 1])
+    return page[:limit], len(page) > limit
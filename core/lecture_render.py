@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+import markdown as md
+
+try:
+    import mammoth
+except Exception:
+    mammoth = None
+
+RENDERABLE = ('md', 'docx')
+
+ERROR_HTML = {
+    'md': '<p>Не удалось загрузить Markdown.</p>',
+    'docx': '<p>Не удалось конвертировать DOCX.</p>',
+}
+
+
+def convert(path, ext):
+    """Конвертировать файл лекции в HTML (без Django, годится для пула процессов)."""
+    if ext == 'md':
+        with open(path, 'r', encoding='utf-8') as f:
+            return md.markdown(f.read())
+    if ext == 'docx' and mammoth:
+        with open(path, 'rb') as f:
+            return mammoth.convert_to_html(f).value
+    return None
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш строк, ограниченный суммарным размером в байтах UTF-8."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # key -> (value, encoded size)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        # Characters undercount Cyrillic text about twice
+        cost = len(value.encode())
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._data[key] = (value, cost)
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.size -= evicted
+
+    def discard(self, match):
+        with self._lock:
+            for key in [k for k in self._data if match(k)]:
+                self.size -= self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+memory_cache = LRUCache(getattr(settings, 'LECTURE_RENDER_MEMORY_BYTES', 32 * 1024 * 1024))
+
+
+def cache_dir():
+    return getattr(settings, 'LECTURE_RENDER_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'lectures'))
+
+
+def source_path(lecture):
+    return os.path.join(settings.MEDIA_ROOT, lecture.file.name)
+
+
+def signature(lecture):
+    """Отпечаток файла лекции: путь + размер + время изменения. None, если файла нет."""
+    try:
+        st = os.stat(source_path(lecture))
+    except OSError:
+        return None
+    raw = f'{lecture.file.name}|{st.st_size}|{st.st_mtime_ns}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _disk_path(lecture_id, digest):
+    return os.path.join(cache_dir(), f'{lecture_id}-{digest}.html')
+
+
+def cached_html(lecture, digest=None):
+    """HTML из кэша (память, затем диск) или None, если лекция ещё не отрендерена."""
+    digest = digest or signature(lecture)
+    if digest is None:
+        return None
+    key = (lecture.pk, digest)
+    html = memory_cache.get(key)
+    if html is not None:
+        return html
+    try:
+        with open(_disk_path(lecture.pk, digest), 'r', encoding='utf-8') as f:
+            html = f.read()
+    except OSError:
+        return None
+    memory_cache.set(key, html)
+    return html
+
+
+def store_html(lecture_id, digest, html):
+    os.makedirs(cache_dir(), exist_ok=True)
+    path = _disk_path(lecture_id, digest)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp, path)
+    _remove_files(lecture_id, keep=os.path.basename(path))
+    memory_cache.set((lecture_id, digest), html)
+
+
+def render_lecture(lecture):
+    """
+    HTML лекции для Markdown/DOCX или None для остальных форматов.
+
+    Повторные обращения к неизменённому файлу обходятся поиском в кэше;
+    ошибки конвертации не кэшируются.
+    """
+    ext = lecture.file_ext
+    if ext not in RENDERABLE or (ext == 'docx' and not mammoth):
+        return None
+    digest = signature(lecture)
+    if digest is not None:
+        html = cached_html(lecture, digest)
+        if html is not None:
+            return html
+    try:
+        html = convert(source_path(lecture), ext)
+    except Exception:
+        return ERROR_HTML[ext]
+    if digest is not None:
+        store_html(lecture.pk, digest, html)
+    return html
+
+
+def invalidate(lecture_id):
+    """Удалить все отрендеренные версии лекции из обоих уровней кэша."""
+    memory_cache.discard(lambda key: key[0] == lecture_id)
+    _remove_files(lecture_id)
+
+
+def _remove_files(lecture_id, keep=None):
+    prefix = f'{lecture_id}-'
+    try:
+        names = os.listdir(cache_dir())
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name.endswith('.html') and name != keep:
+            try:
+                os.remove(os.path.join(cache_dir(), name))
+            except OSError:
+                pass
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+from core.synthetic import SIZES
+
+
+class Command(BaseCommand):
+    help = (
+        'Засеять временную БД синтетическим колледжем и замерить все маршруты core '
+        '(число запросов, время, размер ответа) от имени администратора и студента; '
+        'горячие запросы проверяются по EXPLAIN QUERY PLAN на полный просмотр таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='small')
+        for name in SIZES['small']:
+            parser.add_argument(f'--{name}', type=int, help=f'Переопределить {name} из профиля --size')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3, help='Тёплых повторов на маршрут')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+        parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument('--max-queries', type=int, help='Порог числа запросов на страницу')
+        parser.add_argument('--max-ms', type=float, help='Порог времени ответа, мс')
+        parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help='Допустимое замедление относительно baseline (0.5 = +50%%)')
+
+    def handle(self, *args, **options):
+        sizes = dict(SIZES[options['size']])
+        for name in sizes:
+            if options.get(name) is not None:
+                sizes[name] = options[name]
+
+        report = benchmark.run(sizes, repeat=options['repeat'], seed=options['seed'])
+
+        self.stdout.write(f"Seeded {report['meta']['counts']} in {report['meta']['seed_seconds']:.2f}s")
+        self.stdout.write(f"{'route':<52} {'status':>6} {'queries':>8} {'ms':>9} {'bytes':>9}")
+        for route, row in sorted(report['results'].items()):
+            self.stdout.write(f"{route:<52} {row['status']:>6} {row['queries']:>8} {row['ms']:>9.2f} {row['bytes']:>9}")
+
+        for name, row in sorted(report['plans'].items()):
+            marker = 'SCAN' if row['table_scans'] else 'ok'
+            self.stdout.write(f'{marker:<5} {name}')
+            if options['verbosity'] > 1 or row['table_scans']:
+                for line in row['plan'].splitlines():
+                    self.stdout.write(f'        {line}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        failures = benchmark.check(
+            report,
+            max_queries=options['max_queries'],
+            max_ms=options['max_ms'],
+            baseline=baseline,
+            time_tolerance=options['time_tolerance'],
+        )
+        if failures:
+            raise CommandError('Benchmark thresholds exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All benchmark thresholds passed.'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import StudyGroup
+from core.synthetic import SIZES, STUDENT_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Сгенерировать синтетические данные для нагрузочного тестирования: группы, '
+        'студенты, тесты с вопросами, попытки, расписание и файлы лекций'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='medium')
+        for name in SIZES['medium']:
+            parser.add_argument(f'--{name}', type=int, help=f'Переопределить {name} из профиля --size')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--prefix', default='load', help='Префикс имён групп, логинов и каталога лекций')
+
+    def handle(self, *args, **options):
+        sizes = dict(SIZES[options['size']])
+        for name in sizes:
+            if options.get(name) is not None:
+                sizes[name] = options[name]
+        prefix = options['prefix']
+        if StudyGroup.objects.filter(name__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Данные с префиксом "{prefix}" уже есть, укажите другой --prefix')
+
+        started = time.perf_counter()
+        counts = generate(seed=options['seed'], batch_size=options['batch_size'], prefix=prefix, **sizes)
+        elapsed = time.perf_counter() - started
+
+        for name, value in counts.items():
+            self.stdout.write(f'{name:>10}: {value}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated in {elapsed:.1f}s. Student logins: {prefix}001s001..., password "{STUDENT_PASSWORD}". '
+            'Run prerender_lectures to convert the generated lectures.'
+        ))
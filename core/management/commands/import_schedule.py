@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import timetable
+from core.models import StudyGroup
+
+
+class Command(BaseCommand):
+    help = 'Загрузить недельное расписание группы из файла (строки «день;время;предмет;кабинет»)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('group', help='Название группы')
+        parser.add_argument('path')
+        parser.add_argument('--replace', action='store_true', help='Удалить текущее расписание группы перед загрузкой')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            group = StudyGroup.objects.get(name=options['group'])
+        except StudyGroup.DoesNotExist:
+            raise CommandError(f"Group {options['group']} does not exist")
+        try:
+            with open(options['path'], encoding=options['encoding']) as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+
+        result = timetable.import_week(group, text, replace=options['replace'])
+        if result['errors']:
+            for line, message in result['errors']:
+                self.stderr.write(f'line {line}: {message}')
+            raise CommandError('Nothing imported')
+        for conflict in result['conflicts']:
+            groups = ', '.join(f"{entry['group']} ({entry['subject']})" for entry in conflict['entries'])
+            self.stdout.write(self.style.WARNING(
+                f"Room conflict: {conflict['day_name']} {conflict['time']:%H:%M}, room {conflict['room']}: {groups}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} slots into {group} (removed {result['deleted']})."
+        ))
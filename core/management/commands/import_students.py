@@ -0,0 +1,52 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.student_import import import_students
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт студентов из CSV/XLSX (столбцы username/логин, password/пароль, '
+        'first_name/имя, last_name/фамилия, email, group/группа)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, help='Потоков для хэширования паролей (по умолчанию — число CPU)')
+        parser.add_argument('--encoding', help='Кодировка CSV (по умолчанию UTF-8 или cp1251 — определяется)')
+        parser.add_argument('--no-create-groups', action='store_true', help='Не создавать отсутствующие группы')
+        parser.add_argument('--credentials', help='Записать сгенерированные пароли в CSV вместо вывода')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_students(
+                    f, options['path'],
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    create_groups=not options['no_create_groups'],
+                    encoding=options['encoding'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result['errors']:
+            self.stderr.write(f'line {line}: {message}' if line else message)
+        if result['generated']:
+            if options['credentials']:
+                with open(options['credentials'], 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.writer(f, delimiter=';')
+                    writer.writerow(['username', 'password'])
+                    writer.writerows(result['generated'])
+            else:
+                self.stdout.write('Generated passwords:')
+                for username, password in result['generated']:
+                    self.stdout.write(f'{username};{password}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} students and {result['groups_created']} groups, "
+            f"{len(result['errors'])} errors in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import item_analysis
+from core.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Досчитать анализ заданий тестов по новым попыткам (для запуска по расписанию)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='*', type=int, help='По умолчанию — все тесты')
+        parser.add_argument('--full', action='store_true', help='Пересчитать по всем попыткам')
+        parser.add_argument('--show', action='store_true', help='Вывести показатели по вопросам')
+
+    def handle(self, *args, **options):
+        if item_analysis.np is None:
+            raise CommandError('numpy is not installed: pip install numpy')
+        tests = Test.objects.order_by('id')
+        if options['test_ids']:
+            tests = tests.filter(pk__in=options['test_ids'])
+            missing = set(options['test_ids']) - set(tests.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Tests do not exist: {', '.join(map(str, sorted(missing)))}")
+
+        for test in tests:
+            stats = item_analysis.refresh(test, full=options['full'])
+            rows = item_analysis.report(test)[1] if options['show'] else []
+            self.stdout.write(f'{test.pk} {test.name}: {stats.attempts} attempts')
+            for number, row in enumerate(rows, 1):
+                self.stdout.write(
+                    f"  {number:>3}. n={row['n']} p={row['p']} "
+                    f"discrimination={row['discrimination']} r_pb={row['point_biserial']}"
+                    + (f"  [{'; '.join(row['flags'])}]" if row['flags'] else '')
+                )
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from core import lecture_render
+from core.models import Lecture, LectureRenderJob
+from core.render_queue import claim_job, create_job, finish_job, needs_render, set_status
+
+
+class Command(BaseCommand):
+    help = 'Конвертировать Markdown/DOCX лекции в HTML параллельно (пул процессов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--force', action='store_true', help='Перерендерить даже уже готовые лекции')
+        parser.add_argument('--pending', action='store_true', help='Только лекции с незавершёнными заданиями')
+
+    def handle(self, *args, **options):
+        lectures = Lecture.objects.all()
+        if options['pending']:
+            lectures = lectures.filter(render_status='pending')
+        targets = []
+        for lecture in lectures.iterator():
+            if not needs_render(lecture):
+                if lecture.render_status != 'none':
+                    set_status(lecture.pk, 'none')
+                continue
+            if not (options['force'] or options['pending']) and lecture_render.cached_html(lecture) is not None:
+                continue
+            targets.append(lecture)
+
+        # Jobs interrupted by a server restart are superseded by the new ones
+        LectureRenderJob.objects.filter(
+            lecture__in=targets, status__in=['pending', 'running']
+        ).update(status='failed', error='Прервано, перезапущено командой prerender_lectures')
+
+        jobs = {}
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for lecture in targets:
+                job = create_job(lecture)
+                if not claim_job(job.pk):
+                    continue
+                job.lecture = lecture
+                future = pool.submit(lecture_render.convert, lecture_render.source_path(lecture), lecture.file_ext)
+                jobs[future] = (job, lecture_render.signature(lecture))
+
+            done = failed = 0
+            for future in as_completed(jobs):
+                job, digest = jobs[future]
+                try:
+                    html = future.result()
+                except Exception as exc:
+                    finish_job(job, error=str(exc) or exc.__class__.__name__)
+                    failed += 1
+                    self.stderr.write(f'{job.lecture}: {exc}')
+                    continue
+                finish_job(job, html=html, digest=digest)
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {done} lectures, failed {failed}.'))
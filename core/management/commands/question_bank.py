@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import question_bank
+from core.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Импорт/экспорт вопросов теста в формате Aiken или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['import', 'export'])
+        parser.add_argument('test_id', type=int)
+        parser.add_argument('path', help='Файл (для export "-" — stdout)')
+        parser.add_argument('--format', choices=question_bank.FORMATS,
+                            help='По умолчанию определяется по расширению (.json — JSON, иначе Aiken)')
+        parser.add_argument('--replace', action='store_true', help='Удалить существующие вопросы теста перед импортом')
+
+    def handle(self, *args, **options):
+        try:
+            test = Test.objects.get(pk=options['test_id'])
+        except Test.DoesNotExist:
+            raise CommandError(f"Test {options['test_id']} does not exist")
+        fmt = options['format'] or question_bank.format_for(options['path'])
+
+        if options['action'] == 'export':
+            for question_id, problem in question_bank.export_problems(test, fmt):
+                self.stderr.write(f'Question {question_id} skipped: {problem}')
+            chunks = question_bank.export_questions(test, fmt)
+            if options['path'] == '-':
+                for chunk in chunks:
+                    sys.stdout.write(chunk)
+                return
+            with open(options['path'], 'w', encoding='utf-8') as f:
+                f.writelines(chunks)
+            return
+
+        try:
+            with open(options['path'], 'rb') as f:
+                questions, choices = question_bank.import_questions(test, f, fmt, replace=options['replace'])
+        except (OSError, question_bank.QuestionBankError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Imported {questions} questions with {choices} choices into {test}.'))
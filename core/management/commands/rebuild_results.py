@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.results import rebuild_results
+
+
+class Command(BaseCommand):
+    help = 'Перестроить сводную таблицу результатов (TestResult) по истории попыток'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_results(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} result rows.'))
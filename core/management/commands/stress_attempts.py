@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import stress
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка SQLite: потоки одновременно отправляют попытки тестов '
+        'во временную файловую БД; завершается с ошибкой при "database is locked"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50)
+        parser.add_argument('--attempts', type=int, default=20, help='Попыток на поток')
+        parser.add_argument('--timeout', type=float, help='Переопределить OPTIONS timeout соединения, с')
+        parser.add_argument('--no-tuning', action='store_true',
+                            help='Без PRAGMA и сериализации записи (настройки Django по умолчанию)')
+        parser.add_argument('--limit', type=int,
+                            help='Вместо нагрузки проверить лимит попыток: --threads одновременных '
+                                 'отправок одного студента по тесту с этим лимитом')
+
+    def handle(self, *args, **options):
+        tuned = not options['no_tuning']
+        if options['limit'] is not None:
+            return self.check_limit(options, tuned)
+        stats = stress.run(
+            threads=options['threads'],
+            attempts=options['attempts'],
+            tuned=tuned,
+            timeout=options['timeout'],
+        )
+        self.stdout.write(
+            f"journal_mode={stats['journal_mode']} threads={stats['threads']} "
+            f"attempted={stats['attempted']} inserted={stats['inserted']} stored={stats['stored']} "
+            f"summarized={stats['summarized']} locked={stats['locked']} errors={stats['errors']} "
+            f"{stats['seconds']:.2f}s ({stats['per_second']}/s)"
+        )
+        failures = []
+        if stats['locked'] or stats['errors']:
+            failures.append(f"{stats['locked']} locked, {stats['errors']} other database errors")
+        if stats['stored'] != stats['inserted'] or stats['summarized'] != stats['stored']:
+            failures.append('TestResult summaries do not match stored attempts')
+        if failures:
+            if not tuned:
+                self.stdout.write('Untuned run: ' + '; '.join(failures))
+                return
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No locking errors.'))
+
+    def check_limit(self, options, tuned):
+        stats = stress.run_limit(
+            threads=options['threads'],
+            limit=options['limit'],
+            tuned=tuned,
+            timeout=options['timeout'],
+        )
+        self.stdout.write(
+            f"threads={stats['threads']} limit={stats['limit']} accepted={stats['accepted']} "
+            f"rejected={stats['rejected']} stored={stats['stored']} summarized={stats['summarized']} "
+            f"locked={stats['locked']} errors={stats['errors']} {stats['seconds']:.2f}s"
+        )
+        expected = min(stats['limit'], stats['threads'])
+        failures = []
+        if stats['stored'] > stats['limit']:
+            failures.append(f"limit exceeded: {stats['stored']} attempts stored")
+        if stats['accepted'] != stats['stored'] or stats['summarized'] != stats['stored']:
+            failures.append('accepted, stored and summarized attempts differ')
+        if tuned and (stats['stored'] != expected or stats['locked'] or stats['errors']):
+            failures.append(f"expected exactly {expected} accepted attempts without database errors")
+        if failures:
+            if not tuned:
+                self.stdout.write('Untuned run: ' + '; '.join(failures))
+                return
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Attempt limit holds.'))
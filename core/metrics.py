@@ -0,0 +1,236 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the wall-time histogram buckets, ms
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_current = contextvars.ContextVar('core_metrics_request', default=None)
+
+
+class RequestRecord:
+    __slots__ = ('sql_count', 'sql_ms', 'statements', 'template_ms', 'template_depth')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.statements = []
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+
+class Registry:
+    """Скользящее окно последних запросов по каждому маршруту (в памяти процесса)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.totals = {}
+        self.started = time.time()
+
+    def add(self, view, sample):
+        with self.lock:
+            samples = self.samples.get(view)
+            if samples is None:
+                samples = self.samples[view] = deque(maxlen=self.window)
+                self.totals[view] = 0
+            samples.append(sample)
+            self.totals[view] += 1
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self.lock:
+            samples = {view: list(rows) for view, rows in self.samples.items()}
+            totals = dict(self.totals)
+        views = {}
+        for view, rows in sorted(samples.items()):
+            wall = sorted(row[0] for row in rows)
+            buckets = [0] * len(BUCKETS)
+            for value in wall:
+                buckets[bisect.bisect_left(BUCKETS, value)] += 1
+            views[view] = {
+                'requests': totals[view],
+                'window': len(rows),
+                'errors': sum(1 for row in rows if row[5] >= 500),
+                'ms': {
+                    'mean': round(sum(wall) / len(wall), 3),
+                    'p50': _percentile(wall, 0.5),
+                    'p95': _percentile(wall, 0.95),
+                    'p99': _percentile(wall, 0.99),
+                    'max': round(wall[-1], 3),
+                },
+                'sql_queries': round(sum(row[1] for row in rows) / len(rows), 2),
+                'sql_ms': round(sum(row[2] for row in rows) / len(rows), 3),
+                'template_ms': round(sum(row[3] for row in rows) / len(rows), 3),
+                'bytes': round(sum(row[4] for row in rows) / len(rows)),
+                'histogram': {
+                    ('+Inf' if bound == float('inf') else str(bound)): count
+                    for bound, count in zip(BUCKETS, buckets)
+                },
+            }
+        return {'since': self.started, 'window': self.window, 'views': views}
+
+
+def _percentile(values, p):
+    return round(values[min(int(len(values) * p), len(values) - 1)], 3)
+
+
+registry = Registry(getattr(settings, 'METRICS_WINDOW', 1000))
+
+
+def _record_sql(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        record.sql_count += 1
+        record.sql_ms += elapsed
+        record.statements.append((elapsed, sql))
+
+
+def install_sql_recorder(sender, connection, **kwargs):
+    # Installed on every connection rather than per request: under ASGI the
+    # queries of an async view run on a different thread's connection. The
+    # wrapper is a no-op outside a request (the context variable is unset).
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+connection_created.connect(install_sql_recorder, dispatch_uid='core.metrics.install_sql_recorder')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return super().render(context, request)
+        record.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_depth -= 1
+            if not record.template_depth:
+                # Nested renders are already inside the outer one
+                record.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, замеряющий время рендеринга для MetricsMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            # Report this backend as the one that failed, like DjangoTemplates
+            raise TemplateDoesNotExist(
+                *exc.args, tried=exc.tried, backend=self, chain=exc.chain
+            ) from exc
+
+
+def _response_bytes(response):
+    if not response.streaming:
+        return len(response.content)
+    try:
+        return int(response.get('Content-Length', 0))
+    except ValueError:
+        return 0
+
+
+def _shows_timing(user):
+    # Query counts and timings are backend internals: staff only
+    return bool(user and user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'admin'))
+
+
+class MetricsMiddleware:
+    """
+    Время запроса, число и время SQL, время шаблонов и размер ответа.
+
+    Метрики помечаются именем маршрута (core:take_test) и попадают в
+    скользящее окно registry, а для персонала и администраторов — ещё и в
+    заголовок Server-Timing; запросы дольше METRICS_SLOW_MS пишутся в лог
+    вместе с самыми медленными SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+        self.slow_ms = getattr(settings, 'METRICS_SLOW_MS', 500)
+        self.slow_sql = getattr(settings, 'METRICS_SLOW_SQL', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = getattr(request, 'user', None) if self.server_timing else None
+        return self.finish(request, response, record, start, user)
+
+    async def __acall__(self, request):
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        # request.user would hit the session synchronously inside the event loop
+        user = await request.auser() if self.server_timing and hasattr(request, 'auser') else None
+        return self.finish(request, response, record, start, user)
+
+    def finish(self, request, response, record, start, user=None):
+        wall_ms = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        size = _response_bytes(response)
+        registry.add(view, (wall_ms, record.sql_count, record.sql_ms, record.template_ms, size, response.status_code))
+
+        if self.server_timing and _shows_timing(user):
+            response['Server-Timing'] = (
+                f'total;dur={wall_ms:.1f}, '
+                f'sql;dur={record.sql_ms:.1f};desc="{record.sql_count} queries", '
+                f'tpl;dur={record.template_ms:.1f}'
+            )
+        if self.slow_ms is not None and wall_ms >= self.slow_ms:
+            slowest = sorted(record.statements, key=lambda row: row[0], reverse=True)[:self.slow_sql]
+            logger.warning(
+                'Slow request %s %s [%s]: %.1f ms, %d queries (%.1f ms SQL), template %.1f ms, %d bytes%s',
+                request.method, request.get_full_path(), view, wall_ms, record.sql_count, record.sql_ms,
+                record.template_ms, size,
+                ''.join(f'\n  {ms:8.1f} ms  {sql}' for ms, sql in slowest),
+            )
+        return response
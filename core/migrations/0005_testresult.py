@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+
+
+def populate_results(apps, schema_editor):
+    TestAttempt = apps.get_model('core', 'TestAttempt')
+    TestResult = apps.get_model('core', 'TestResult')
+    last = TestAttempt.objects.filter(
+        user=OuterRef('user'), test=OuterRef('test')
+    ).order_by('-created', '-id').values('score')[:1]
+    rows = (
+        TestAttempt.objects.values('user_id', 'test_id')
+        .annotate(n=Count('id'), best=Max('score'), total=Sum('score'), last_at=Max('created'), last=Subquery(last))
+        .order_by()
+    )
+    TestResult.objects.bulk_create([
+        TestResult(
+            user_id=row['user_id'],
+            test_id=row['test_id'],
+            attempts=row['n'],
+            best_score=row['best'],
+            last_score=row['last'],
+            score_sum=row['total'],
+            last_attempt_at=row['last_at'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_test_attempts_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('last_score', models.FloatField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='core.test')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'test')},
+            },
+        ),
+        migrations.RunPython(populate_results, migrations.RunPython.noop),
+    ]
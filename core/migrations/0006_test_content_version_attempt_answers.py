@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_testresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Увеличивается при изменении вопросов и вариантов ответа'),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='answers',
+            field=models.JSONField(blank=True, default=dict, help_text='Ответы по вопросам: {question_id: {"choice": id, "correct": bool}}'),
+        ),
+    ]
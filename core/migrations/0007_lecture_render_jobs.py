@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_test_content_version_attempt_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='render_status',
+            field=models.CharField(choices=[('none', 'Не требуется'), ('pending', 'В очереди'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='none', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='render_updated',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='LectureRenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to='core.lecture')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_lecture_render_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='testattempt',
+            name='test',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.test'),
+        ),
+        migrations.AlterField(
+            model_name='testattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['user', 'test', '-score'], name='attempt_user_test_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['test', 'user'], name='attempt_test_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['user', '-created'], name='attempt_user_created_idx'),
+        ),
+    ]
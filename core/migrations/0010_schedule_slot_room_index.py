@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_user_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day_of_week', 'time', 'room'], name='schedule_slot_room_idx'),
+        ),
+    ]
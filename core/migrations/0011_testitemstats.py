@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_schedule_slot_room_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestItemStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_version', models.PositiveIntegerField(default=0)),
+                ('last_attempt_id', models.PositiveBigIntegerField(default=0, help_text='Последняя учтённая попытка')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('test', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_stats', to='core.test')),
+            ],
+        ),
+    ]
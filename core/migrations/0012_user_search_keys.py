@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:40
+
+import core.models
+from django.db import migrations, models
+
+
+def fill_search_keys(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    users = list(User.objects.only('username', 'first_name', 'last_name'))
+    for user in users:
+        user.username_key = core.models.search_key(user.username)
+        user.first_name_key = core.models.search_key(user.first_name)
+        user.last_name_key = core.models.search_key(user.last_name)
+    User.objects.bulk_update(users, ['username_key', 'first_name_key', 'last_name_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0011_testitemstats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_last_name_idx',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='first_name_key',
+            field=core.models.SearchKeyField(default='', max_length=150, source='first_name'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_name_key',
+            field=core.models.SearchKeyField(default='', max_length=150, source='last_name'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='username_key',
+            field=core.models.SearchKeyField(default='', max_length=150, source='username'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username_key'], name='user_username_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['first_name_key'], name='user_first_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name_key'], name='user_last_name_key_idx'),
+        ),
+    ]
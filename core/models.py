@@ -2,6 +2,41 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
+class VisibleToQuerySet(models.QuerySet):
+    """
+    QuerySet с фильтром видимости для пользователя.
+
+    Администратор видит всё, студент — только объекты своей группы
+    (путь к группе задаёт group_lookup), аноним и студент без группы — ничего.
+    """
+    group_lookup = None
+
+    def visible_to(self, user):
+        if not user.is_authenticated:
+            return self.none()
+        if user.role == 'admin':
+            return self.all()
+        if not user.study_group_id:
+            return self.none()
+        return self.filter(**{self.group_lookup: user.study_group_id})
+
+
+class SubjectQuerySet(VisibleToQuerySet):
+    group_lookup = 'group_id'
+
+
+class ModuleQuerySet(VisibleToQuerySet):
+    group_lookup = 'subject__group_id'
+
+
+class LectureQuerySet(VisibleToQuerySet):
+    group_lookup = 'assigned_groups'
+
+
+class TestQuerySet(VisibleToQuerySet):
+    group_lookup = 'module__subject__group_id'
+
+
 class StudyGroup(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
@@ -13,10 +48,44 @@ class Subject(models.Model):
     name = models.CharField(max_length=200)
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='subjects')
 
+    objects = SubjectQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.group})"
 
 
+def search_key(value):
+    """Ключ поиска по началу строки: нижний регистр, «ё» как «е»."""
+    return (value or '').lower().replace('ё', 'е')
+
+
+class SearchKeyField(models.CharField):
+    """
+    Копия поля source в виде search_key(), обновляется при каждом сохранении.
+
+    SQLite сравнивает без учёта регистра только ASCII (LIKE, lower()), поэтому
+    поиск по кириллице идёт по этой копии. pre_save вызывается и в
+    bulk_create; update() копию не обновляет.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        del kwargs['editable']
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = search_key(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('admin', 'Administrator'),
@@ -24,12 +93,29 @@ class User(AbstractUser):
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
     study_group = models.ForeignKey(StudyGroup, null=True, blank=True, on_delete=models.SET_NULL)
+    # Case-insensitive prefix search in the user directory
+    username_key = SearchKeyField(max_length=150, source='username')
+    first_name_key = SearchKeyField(max_length=150, source='first_name')
+    last_name_key = SearchKeyField(max_length=150, source='last_name')
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # User directory: filter, then keyset pagination by username
+            models.Index(fields=['role', 'username'], name='user_role_username_idx'),
+            models.Index(fields=['study_group', 'username'], name='user_group_username_idx'),
+            # Prefix search by login, first name or surname
+            models.Index(fields=['username_key'], name='user_username_key_idx'),
+            models.Index(fields=['first_name_key'], name='user_first_name_key_idx'),
+            models.Index(fields=['last_name_key'], name='user_last_name_key_idx'),
+        ]
 
 
 class Module(models.Model):
     name = models.CharField(max_length=200)
     subject = models.ForeignKey(Subject, null=True, blank=True, on_delete=models.CASCADE, related_name='modules')
 
+    objects = ModuleQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.subject})"
 
@@ -39,10 +125,21 @@ def lecture_upload_to(instance, filename):
 
 
 class Lecture(models.Model):
+    RENDER_STATUS_CHOICES = (
+        ('none', 'Не требуется'),
+        ('pending', 'В очереди'),
+        ('ready', 'Готово'),
+        ('failed', 'Ошибка'),
+    )
+
     title = models.CharField(max_length=255)
     file = models.FileField(upload_to=lecture_upload_to)
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='lectures')
     assigned_groups = models.ManyToManyField(StudyGroup, blank=True)
+    render_status = models.CharField(max_length=10, choices=RENDER_STATUS_CHOICES, default='none', editable=False)
+    render_updated = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LectureQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -59,10 +156,33 @@ class Lecture(models.Model):
         return 'other'
 
 
+class LectureRenderJob(models.Model):
+    """Задание фоновой конвертации лекции в HTML."""
+    STATUS_CHOICES = (
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    )
+
+    lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='render_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.lecture} - {self.get_status_display()}"
+
+
 class Test(models.Model):
     name = models.CharField(max_length=255)
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='tests')
     attempts_limit = models.IntegerField(default=3, help_text='Максимальное количество попыток на прохождение теста')
+    content_version = models.PositiveIntegerField(default=1, editable=False, help_text='Увеличивается при изменении вопросов и вариантов ответа')
+
+    objects = TestQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -86,25 +206,41 @@ class Choice(models.Model):
 
 
 class TestAttempt(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    test = models.ForeignKey(Test, on_delete=models.CASCADE)
+    # Single-column FK indexes are covered by the composite indexes below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, db_index=False)
     score = models.FloatField()
+    answers = models.JSONField(default=dict, blank=True, help_text='Ответы по вопросам: {question_id: {"choice": id, "correct": bool}}')
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Attempts of a student on a test, best first
+            models.Index(fields=['user', 'test', '-score'], name='attempt_user_test_score_idx'),
+            # Per-test journal and cascades from Test
+            models.Index(fields=['test', 'user'], name='attempt_test_user_idx'),
+            # Student journal: latest attempts first
+            models.Index(fields=['user', '-created'], name='attempt_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.test} - {self.score}"
 
 
+DAY_CHOICES = [
+    (1, 'Понедельник'),
+    (2, 'Вторник'),
+    (3, 'Среда'),
+    (4, 'Четверг'),
+    (5, 'Пятница'),
+    (6, 'Суббота'),
+    (7, 'Воскресенье'),
+]
+DAY_NAMES = dict(DAY_CHOICES)
+
+
 class Schedule(models.Model):
-    DAY_CHOICES = [
-        (1, 'Понедельник'),
-        (2, 'Вторник'),
-        (3, 'Среда'),
-        (4, 'Четверг'),
-        (5, 'Пятница'),
-        (6, 'Суббота'),
-        (7, 'Воскресенье'),
-    ]
+    DAY_CHOICES = DAY_CHOICES
     
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='schedules')
     day_of_week = models.IntegerField(choices=DAY_CHOICES)
@@ -115,7 +251,44 @@ class Schedule(models.Model):
     class Meta:
         ordering = ['day_of_week', 'time']
         unique_together = ['group', 'day_of_week', 'time']
+        indexes = [
+            # Room conflicts: who else is in this room at this slot
+            models.Index(fields=['day_of_week', 'time', 'room'], name='schedule_slot_room_idx'),
+        ]
     
     def __str__(self):
-        day_name = dict(self.DAY_CHOICES)[self.day_of_week]
-        return f"{self.group.name} - {day_name} {self.time} - {self.subject}"
+        return f"{self.group.name} - {DAY_NAMES.get(self.day_of_week, self.day_of_week)} {self.time} - {self.subject}"
+
+
+class TestResult(models.Model):
+    """Сводка попыток студента по тесту, обновляется при каждой новой попытке."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_results')
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='results')
+    attempts = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField(default=0)
+    last_score = models.FloatField(default=0)
+    score_sum = models.FloatField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'test']
+
+    def __str__(self):
+        return f"{self.user} - {self.test}: {self.best_score} ({self.attempts})"
+
+    @property
+    def average(self):
+        return self.score_sum / self.attempts if self.attempts else 0
+
+
+class TestItemStats(models.Model):
+    """Накопленные суммы для анализа заданий теста (core/item_analysis.py)."""
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, related_name='item_stats')
+    content_version = models.PositiveIntegerField(default=0)
+    last_attempt_id = models.PositiveBigIntegerField(default=0, help_text='Последняя учтённая попытка')
+    attempts = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.test}: {self.attempts} попыток"
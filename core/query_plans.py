@@ -0,0 +1,51 @@
+import re
+
+from django.db import connection
+
+from . import journal
+from .models import Schedule, TestAttempt, TestResult
+
+# "SCAN core_testattempt" is a full table scan; "SCAN t USING [COVERING] INDEX i"
+# walks an index and is fine. The \b keeps the lookahead from backtracking
+# into the name ("core_testattemp" + "t USING")
+TABLE_SCAN_RE = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+
+# Tables that grow with usage; a scan of a small lookup table (core_test,
+# core_module) driving an indexed join is acceptable
+LARGE_TABLES = {
+    TestAttempt._meta.db_table,
+    TestResult._meta.db_table,
+    Schedule._meta.db_table,
+}
+
+
+def hot_queries(user, test, subject, group):
+    """Запросы горячих страниц: (название, QuerySet)."""
+    return [
+        ('take_test: result of user on test', TestResult.objects.filter(user=user, test=test)),
+        ('best attempt of user on test', TestAttempt.objects.filter(user=user, test=test).order_by('-score')[:1]),
+        ('refresh_result: attempts of user on test',
+         TestAttempt.objects.filter(user_id=user.pk, test_id=test.pk).order_by('created', 'id')),
+        ('student_journal: stats by subject', journal.subject_stats(user)),
+        ('student_journal: subject history',
+         TestAttempt.objects.filter(user=user, test__module__subject=subject).order_by('-created', '-id')[:50]),
+        ('journal: attempts on test', TestAttempt.objects.filter(test=test).values('user_id').distinct()),
+        ('admin journal: attempts in subject', TestAttempt.objects.filter(test__module__subject=subject)),
+        ('gradebook: results in subject', TestResult.objects.filter(test__module__subject=subject)),
+        ('schedule of group', Schedule.objects.filter(group=group).order_by('day_of_week', 'time')),
+    ]
+
+
+def table_scans(plan):
+    return sorted({table for table in TABLE_SCAN_RE.findall(plan) if table in LARGE_TABLES})
+
+
+def collect(user, test, subject, group):
+    """EXPLAIN QUERY PLAN для горячих запросов (только SQLite)."""
+    if connection.vendor != 'sqlite':
+        return {}
+    plans = {}
+    for name, queryset in hot_queries(user, test, subject, group):
+        plan = queryset.explain()
+        plans[name] = {'plan': plan, 'table_scans': table_scans(plan)}
+    return plans
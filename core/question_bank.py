@@ -0,0 +1,272 @@
+import io
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .grading import bump_test_version
+from .models import Choice, Question
+
+FORMATS = ('aiken', 'json')
+
+OPTION_RE = re.compile(r'^([A-Za-zА-Яа-яЁё])[.)]\s+(.+)$')
+ANSWER_RE = re.compile(r'^(?:ANSWER|ОТВЕТ)\s*:\s*(.+)$', re.IGNORECASE)
+LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CHOICE_MAX_LENGTH = Choice._meta.get_field('text').max_length
+
+JSON_CHUNK = 64 * 1024
+EXPORT_CHUNK = 200
+
+
+class QuestionBankError(ValueError):
+    """Ошибка разбора; where — «строка N» (Aiken) или «вопрос N» (JSON)."""
+
+    def __init__(self, where, message):
+        super().__init__(f'{where}: {message}' if where else message)
+        self.where = where
+
+
+def format_for(filename, default='aiken'):
+    return 'json' if filename.lower().endswith('.json') else default
+
+
+def parse_aiken(lines):
+    """
+    Потоковый разбор формата Aiken: текст вопроса (одна или несколько строк),
+    варианты «A. …» / «Б) …», затем «ANSWER: B» (несколько правильных —
+    через запятую). Вопросы разделяются пустой строкой.
+    """
+    text, options, start = [], [], None
+    for number, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line:
+            continue
+        answer = ANSWER_RE.match(line)
+        if answer:
+            if not options:
+                raise QuestionBankError(f'строка {number}', 'ANSWER без вариантов ответа')
+            labels = {label.strip().upper() for label in re.split(r'[,;\s]+', answer.group(1)) if label.strip()}
+            known = {label for label, _ in options}
+            if not labels or labels - known:
+                raise QuestionBankError(f'строка {number}', f'Неизвестный вариант в ANSWER: {answer.group(1)}')
+            yield f'строка {start}', {
+                'text': '\n'.join(text),
+                'choices': [{'text': body, 'correct': label in labels} for label, body in options],
+            }
+            text, options, start = [], [], None
+            continue
+        option = OPTION_RE.match(line)
+        if option and text:
+            label = option.group(1).upper()
+            if any(label == seen for seen, _ in options):
+                raise QuestionBankError(f'строка {number}', f'Вариант {label} повторяется')
+            options.append((label, option.group(2)))
+            continue
+        if options:
+            raise QuestionBankError(f'строка {number}', 'Ожидался вариант ответа или строка ANSWER')
+        if start is None:
+            start = number
+        text.append(line)
+    if text:
+        raise QuestionBankError(f'строка {start}', 'Вопрос без строки ANSWER')
+
+
+def parse_json(stream):
+    """Потоковый разбор JSON-массива [{"text": …, "choices": [{"text": …, "correct": …}]}]."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(JSON_CHUNK)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_blank():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip_blank()
+    if buffer[pos:pos + 1] != '[':
+        raise QuestionBankError(None, 'Ожидался JSON-массив вопросов')
+    pos += 1
+    index = 0
+    while True:
+        skip_blank()
+        if pos >= len(buffer):
+            raise QuestionBankError(f'вопрос {index + 1}', 'Неожиданный конец JSON')
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as exc:
+            if eof:
+                raise QuestionBankError(f'вопрос {index + 1}', f'Некорректный JSON: {exc.msg}')
+            fill()
+            continue
+        pos = end
+        index += 1
+        if not isinstance(item, dict) or not isinstance(item.get('choices'), list):
+            raise QuestionBankError(f'вопрос {index}', 'Вопрос должен быть объектом с полями text и choices')
+        yield f'вопрос {index}', {
+            'text': str(item.get('text', '')).strip(),
+            'choices': [
+                {'text': str(choice.get('text', '')).strip(), 'correct': bool(choice.get('correct'))}
+                for choice in item['choices'] if isinstance(choice, dict)
+            ],
+        }
+
+
+def _problem(item):
+    """Почему разобранный вопрос нельзя импортировать (None — можно)."""
+    if not item['text']:
+        return 'пустой текст вопроса'
+    if len(item['choices']) < 2:
+        return 'нужно не меньше двух вариантов ответа'
+    if not any(choice['correct'] for choice in item['choices']):
+        return 'нет правильного варианта'
+    for choice in item['choices']:
+        if not choice['text']:
+            return 'пустой вариант ответа'
+        if len(choice['text']) > CHOICE_MAX_LENGTH:
+            return f'вариант длиннее {CHOICE_MAX_LENGTH} символов'
+    return None
+
+
+def _validate(position, item):
+    problem = _problem(item)
+    if problem:
+        raise QuestionBankError(position, problem[:1].upper() + problem[1:])
+
+
+def import_questions(test, fileobj, fmt='aiken', replace=False):
+    """
+    Импортировать вопросы в тест из бинарного потока.
+
+    Файл разбирается потоково; вопросы и варианты вставляются двумя
+    bulk_create в одной транзакции (ошибка в любой строке — ничего не
+    сохраняется). replace=True сначала удаляет вопросы теста.
+    Возвращает (число вопросов, число вариантов).
+    """
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        items = parse_json(stream) if fmt == 'json' else parse_aiken(stream)
+        questions, choices = [], []
+        for position, item in items:
+            _validate(position, item)
+            question = Question(test=test, text=item['text'])
+            questions.append(question)
+            choices.extend((question, choice) for choice in item['choices'])
+    except UnicodeDecodeError:
+        raise QuestionBankError(None, 'Файл должен быть в кодировке UTF-8')
+    finally:
+        stream.detach()
+
+    with transaction.atomic():
+        if replace:
+            test.questions.all().delete()
+        Question.objects.bulk_create(questions)
+        Choice.objects.bulk_create([
+            Choice(question=question, text=choice['text'], correct=choice['correct'])
+            for question, choice in choices
+        ])
+        # bulk_create sends no post_save: invalidate cached answer keys once
+        bump_test_version(pk=test.pk)
+    return len(questions), len(choices)
+
+
+def _questions(test):
+    return (
+        Question.objects.filter(test=test)
+        .order_by('id')
+        .prefetch_related(Prefetch('choices', queryset=Choice.objects.order_by('id')))
+        .iterator(chunk_size=EXPORT_CHUNK)
+    )
+
+
+def _aiken_text(question):
+    return '\n'.join(line.strip() for line in question.text.splitlines() if line.strip())
+
+
+def _exported(question, choices, fmt):
+    """Вопрос в том виде, в каком его прочитает импорт после экспорта в fmt."""
+    if fmt == 'json':
+        text = question.text.strip()
+        choices = [{'text': choice.text.strip(), 'correct': choice.correct} for choice in choices]
+    else:
+        text = _aiken_text(question)
+        choices = [{'text': ' '.join(choice.text.split()), 'correct': choice.correct} for choice in choices]
+    return {'text': text, 'choices': choices}
+
+
+def export_problem(question, choices, fmt='aiken'):
+    """
+    Почему вопрос не прочитать обратно после экспорта в fmt (None — можно).
+
+    Те же правила, что у импорта; для Aiken ещё не больше 26 вариантов и
+    ни одной строки текста вопроса, похожей на вариант или ANSWER.
+    """
+    if fmt == 'aiken':
+        if len(choices) > len(LABELS):
+            return f'больше {len(LABELS)} вариантов ответа'
+        if any(OPTION_RE.match(line) or ANSWER_RE.match(line) for line in _aiken_text(question).splitlines()):
+            return 'строка текста похожа на вариант ответа или ANSWER'
+    return _problem(_exported(question, choices, fmt))
+
+
+def export_problems(test, fmt='aiken'):
+    """[(id вопроса, причина)] для вопросов, которые экспорт в fmt пропустит."""
+    problems = []
+    for question in _questions(test):
+        problem = export_problem(question, list(question.choices.all()), fmt)
+        if problem:
+            problems.append((question.pk, problem))
+    return problems
+
+
+def export_aiken(test):
+    """
+    Поток строк Aiken; вопросы читаются пачками по EXPORT_CHUNK.
+
+    Вопросы, которые не прочитать обратно (см. export_problem), пропускаются:
+    посреди потокового ответа ошибку уже не вернуть.
+    """
+    for question in _questions(test):
+        choices = list(question.choices.all())
+        if export_problem(question, choices, 'aiken'):
+            continue
+        item = _exported(question, choices, 'aiken')
+        lines = [item['text']]
+        lines += [f'{LABELS[i]}. {choice["text"]}' for i, choice in enumerate(item['choices'])]
+        correct = ', '.join(LABELS[i] for i, choice in enumerate(item['choices']) if choice['correct'])
+        lines.append(f'ANSWER: {correct}')
+        yield '\n'.join(lines) + '\n\n'
+
+
+def export_json(test):
+    """Поток JSON-массива вопросов (без тех, что не прочитать обратно); пачками по EXPORT_CHUNK."""
+    yield '[\n'
+    separator = ''
+    for question in _questions(test):
+        choices = list(question.choices.all())
+        if export_problem(question, choices, 'json'):
+            continue
+        item = {
+            'text': question.text,
+            'choices': [{'text': choice.text, 'correct': choice.correct} for choice in choices],
+        }
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def export_questions(test, fmt='aiken'):
+    return export_json(test) if fmt == 'json' else export_aiken(test)
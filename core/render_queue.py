@@ -0,0 +1,113 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import lecture_render
+from .models import Lecture, LectureRenderJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'LECTURE_RENDER_WORKERS', 2),
+                thread_name_prefix='lecture-render',
+            )
+        return _executor
+
+
+def needs_render(lecture):
+    return lecture.file_ext in lecture_render.RENDERABLE
+
+
+def set_status(lecture_id, status):
+    Lecture.objects.filter(pk=lecture_id).update(render_status=status, render_updated=timezone.now())
+
+
+def create_job(lecture):
+    """Поставить лекцию в очередь (только запись в БД, без запуска)."""
+    job = LectureRenderJob.objects.create(lecture=lecture)
+    set_status(lecture.pk, 'pending')
+    return job
+
+
+def enqueue(lecture):
+    """
+    Создать задание и запустить его в пуле потоков после фиксации транзакции.
+
+    Задания хранятся в БД, поэтому внешний брокер не нужен; прерванные
+    перезапуском сервера задания подбирает команда prerender_lectures.
+    """
+    if not needs_render(lecture):
+        set_status(lecture.pk, 'none')
+        return None
+    job = create_job(lecture)
+    if getattr(settings, 'LECTURE_RENDER_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    else:
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def claim_job(job_id):
+    """Перевести задание в running; False, если его уже взял другой обработчик."""
+    return bool(
+        LectureRenderJob.objects.filter(pk=job_id, status='pending')
+        .update(status='running', started=timezone.now())
+    )
+
+
+def finish_job(job, html=None, digest=None, error=''):
+    if error:
+        job.status = 'failed'
+        job.error = error
+    else:
+        if digest is not None and html is not None:
+            lecture_render.store_html(job.lecture_id, digest, html)
+        job.status = 'done'
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished'])
+    set_status(job.lecture_id, 'failed' if error else 'ready')
+
+
+def run_job(job_id):
+    if not claim_job(job_id):
+        return
+    job = LectureRenderJob.objects.select_related('lecture').get(pk=job_id)
+    lecture = job.lecture
+    digest = lecture_render.signature(lecture)
+    try:
+        html = lecture_render.convert(lecture_render.source_path(lecture), lecture.file_ext)
+    except Exception as exc:
+        logger.exception('Lecture %s render failed', lecture.pk)
+        finish_job(job, error=str(exc) or exc.__class__.__name__)
+        return
+    finish_job(job, html=html, digest=digest)
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception('Lecture render job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+def is_pending(lecture):
+    """Лекция ждёт фоновой конвертации (и задание ещё не считается зависшим)."""
+    if lecture.render_status != 'pending' or lecture.render_updated is None:
+        return False
+    stale_after = getattr(settings, 'LECTURE_RENDER_STALE_SECONDS', 300)
+    return (timezone.now() - lecture.render_updated).total_seconds() < stale_after
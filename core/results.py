@@ -0,0 +1,148 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .db import serialized_write
+from .models import TestAttempt, TestResult
+
+
+def record_attempt(user, test, score, answers=None):
+    """Сохранить попытку; сводка TestResult обновляется в той же транзакции."""
+    with serialized_write():
+        return TestAttempt.objects.create(user=user, test=test, score=score, answers=answers or {})
+
+
+def reserve_attempt(user, test, score, answers=None):
+    """
+    Проверить лимит попыток и сохранить попытку одной транзакцией записи.
+
+    Строка сводки TestResult служит счётчиком: она блокируется
+    (select_for_update; на SQLite вся транзакция идёт под BEGIN IMMEDIATE
+    и блокировкой serialized_write), поэтому параллельные отправки одного
+    студента проверяют лимит по очереди. Возвращает словарь: accepted,
+    attempt (или None), attempts, remaining и last_score — итог без
+    дополнительных запросов.
+    """
+    limit = test.attempts_limit
+    with serialized_write():
+        summary = TestResult.objects.select_for_update().filter(user=user, test=test).first()
+        if summary is None and limit > 0:
+            try:
+                with transaction.atomic():
+                    # Counter row to lock; the attempt below fills it in
+                    summary = TestResult.objects.create(user=user, test=test)
+            except IntegrityError:
+                summary = TestResult.objects.select_for_update().get(user=user, test=test)
+        # No row only when nothing can be accepted: nothing is written then
+        done = summary.attempts if summary else 0
+        if done >= limit:
+            return {
+                'accepted': False,
+                'attempt': None,
+                'attempts': done,
+                'remaining': 0,
+                'last_score': summary.last_score if summary else 0,
+            }
+        attempt = TestAttempt.objects.create(user=user, test=test, score=score, answers=answers or {})
+    attempts = done + 1
+    return {
+        'accepted': True,
+        'attempt': attempt,
+        'attempts': attempts,
+        'remaining': max(limit - attempts, 0),
+        'last_score': score,
+    }
+
+
+def apply_attempt(attempt):
+    """Учесть новую попытку в сводке без пересчёта истории."""
+    summary = TestResult.objects.filter(user_id=attempt.user_id, test_id=attempt.test_id)
+    changes = {
+        'attempts': F('attempts') + 1,
+        'best_score': Greatest('best_score', attempt.score),
+        'last_score': attempt.score,
+        'score_sum': F('score_sum') + attempt.score,
+        'last_attempt_at': attempt.created,
+    }
+    with transaction.atomic():
+        if summary.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                TestResult.objects.create(
+                    user_id=attempt.user_id,
+                    test_id=attempt.test_id,
+                    attempts=1,
+                    best_score=attempt.score,
+                    last_score=attempt.score,
+                    score_sum=attempt.score,
+                    last_attempt_at=attempt.created,
+                )
+        except IntegrityError:
+            # Row was created concurrently, fall back to the counter update
+            summary.update(**changes)
+
+
+def summarize(attempts):
+    """
+    Сводки по парам (студент, тест) за один упорядоченный проход по попыткам.
+
+    Отдаёт словари с полями модели TestResult; память не зависит от числа попыток.
+    """
+    rows = (
+        attempts.order_by('user_id', 'test_id', 'created', 'id')
+        .values_list('user_id', 'test_id', 'score', 'created')
+        .iterator(chunk_size=2000)
+    )
+    current = None
+    for user_id, test_id, score, created in rows:
+        if current is None or (current['user_id'], current['test_id']) != (user_id, test_id):
+            if current is not None:
+                yield current
+            current = {
+                'user_id': user_id,
+                'test_id': test_id,
+                'attempts': 0,
+                'best_score': score,
+                'score_sum': 0,
+            }
+        current['attempts'] += 1
+        current['best_score'] = max(current['best_score'], score)
+        current['score_sum'] += score
+        current['last_score'] = score
+        current['last_attempt_at'] = created
+    if current is not None:
+        yield current
+
+
+def refresh_result(user_id, test_id):
+    """Пересчитать сводку одной пары (студент, тест) из истории попыток."""
+    rows = list(summarize(TestAttempt.objects.filter(user_id=user_id, test_id=test_id)))
+    if not rows:
+        TestResult.objects.filter(user_id=user_id, test_id=test_id).delete()
+        return
+    defaults = dict(rows[0])
+    del defaults['user_id'], defaults['test_id']
+    TestResult.objects.update_or_create(user_id=user_id, test_id=test_id, defaults=defaults)
+
+
+def rebuild_results(batch_size=1000, users=None):
+    """Перестроить таблицу сводок по истории попыток: всю или только студентов users."""
+    results = TestResult.objects.all()
+    attempts = TestAttempt.objects.all()
+    if users is not None:
+        results = results.filter(user__in=users)
+        attempts = attempts.filter(user__in=users)
+    with transaction.atomic():
+        results.delete()
+        batch = []
+        created = 0
+        for row in summarize(attempts):
+            batch.append(TestResult(**row))
+            if len(batch) >= batch_size:
+                TestResult.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        TestResult.objects.bulk_create(batch)
+        created += len(batch)
+    return created
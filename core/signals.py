@@ -0,0 +1,113 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .grading import bump_test_version
+from . import content_cache, lecture_render, render_queue
+from .models import Choice, Lecture, Module, Question, Schedule, StudyGroup, Subject, Test, TestAttempt
+from .results import apply_attempt, refresh_result
+
+
+@receiver(post_save, sender=TestAttempt)
+def attempt_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_attempt(instance)
+    else:
+        refresh_result(instance.user_id, instance.test_id)
+
+
+@receiver(post_delete, sender=TestAttempt)
+def attempt_deleted(sender, instance, origin=None, **kwargs):
+    # Cascades from a deleted user/test remove the summary row themselves
+    if origin is not None and not (isinstance(origin, TestAttempt) or getattr(origin, 'model', None) is TestAttempt):
+        return
+    refresh_result(instance.user_id, instance.test_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_test_version(pk=instance.test_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_test_version(questions=instance.question_id)
+
+
+@receiver(pre_save, sender=Lecture)
+def lecture_file_changing(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    old_name = Lecture.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+    if old_name != instance.file.name:
+        lecture_render.invalidate(instance.pk)
+        instance._file_changed = True
+
+
+@receiver(post_save, sender=Lecture)
+def lecture_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created or getattr(instance, '_file_changed', False):
+        instance._file_changed = False
+        render_queue.enqueue(instance)
+
+
+@receiver(post_delete, sender=Lecture)
+def lecture_deleted(sender, instance, **kwargs):
+    lecture_render.invalidate(instance.pk)
+
+
+@receiver(pre_save, sender=Subject)
+@receiver(pre_save, sender=Module)
+@receiver(pre_save, sender=Lecture)
+@receiver(pre_save, sender=Test)
+@receiver(pre_save, sender=Schedule)
+def content_moving(sender, instance, raw=False, **kwargs):
+    # Remember the group before the save so a move invalidates both groups
+    if raw or instance.pk is None:
+        return
+    instance._content_group = content_cache.stored_group(sender, instance.pk)
+
+
+@receiver(post_save, sender=StudyGroup)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Lecture)
+@receiver(post_save, sender=Test)
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=StudyGroup)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Lecture)
+@receiver(post_delete, sender=Test)
+@receiver(post_delete, sender=Schedule)
+def content_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # On cascades the parent may already be gone; its own signal covers the group
+    content_cache.invalidate(
+        content_cache.KINDS[sender],
+        content_cache.group_of(instance),
+        getattr(instance, '_content_group', None),
+    )
+
+
+@receiver(m2m_changed, sender=Lecture.assigned_groups.through)
+def lecture_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        content_cache.invalidate(content_cache.TREE, content_cache.group_of(instance))
+        return
+    # Changed from the group side: pk_set holds lecture ids (None on clear)
+    lectures = instance.lecture_set.all() if action == 'pre_clear' else Lecture.objects.filter(pk__in=pk_set)
+    content_cache.invalidate(
+        content_cache.TREE,
+        *lectures.values_list(content_cache.GROUP_LOOKUPS[Lecture], flat=True),
+    )
@@ -0,0 +1,191 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from . import synthetic
+from .grading import answer_key, grade_submission
+from .models import Test, TestAttempt, TestResult, User
+from .results import reserve_attempt
+
+
+def _submit(test, user, data, tuned):
+    result = grade_submission(test, data)
+    if tuned:
+        # What take_test does on POST
+        reserve_attempt(user, test, result['score'], result['answers'])
+        return
+    # Untuned baseline: read the summary, then a plain deferred transaction,
+    # no in-process queueing
+    TestResult.objects.filter(user=user, test=test).first()
+    with transaction.atomic():
+        TestAttempt.objects.create(user=user, test=test, score=result['score'], answers=result['answers'])
+
+
+def _worker(barrier, test, user, data, attempts, tuned, stats, lock):
+    done = locked = other = 0
+    try:
+        barrier.wait()
+        for _ in range(attempts):
+            try:
+                _submit(test, user, data, tuned)
+                done += 1
+            except OperationalError as exc:
+                if 'locked' in str(exc) or 'busy' in str(exc):
+                    locked += 1
+                else:
+                    other += 1
+    finally:
+        connections.close_all()
+        with lock:
+            stats['inserted'] += done
+            stats['locked'] += locked
+            stats['errors'] += other
+
+
+@contextmanager
+def stress_database(threads, tuned=True, timeout=None, attempts_limit=10 ** 6):
+    """
+    Временная файловая SQLite-БД с одним тестом и threads студентами.
+
+    tuned=False отключает PRAGMA и сериализацию записи, чтобы сравнить
+    с настройками Django по умолчанию. Отдаёт (test, users, data), где
+    data — POST-данные с правильными ответами.
+    """
+    db = settings.DATABASES['default']
+    if db['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ValueError('Stress test targets the SQLite backend')
+
+    directory = tempfile.mkdtemp(prefix='mik-edu-stress-')
+    db_path = os.path.join(directory, 'stress.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    old_test = dict(connection.settings_dict.get('TEST', {}))
+    old_options = dict(connection.settings_dict.get('OPTIONS', {}))
+    options = dict(old_options)
+    if not tuned:
+        options = {}
+    if timeout is not None:
+        options['timeout'] = timeout
+
+    setup_test_environment()
+    # A file database: in-memory test databases hide the locking behaviour
+    connection.settings_dict['TEST'] = {**old_test, 'NAME': db_path}
+    connection.settings_dict['OPTIONS'] = options
+    overrides = override_settings(
+        SQLITE_TUNING=tuned,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'stress'}},
+    )
+    overrides.enable()
+    connection.close()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        synthetic.generate(
+            groups=1, subjects=1, modules=1, tests=1, questions=10,
+            students=threads, attempts=0, prefix='stress',
+        )
+        test = Test.objects.get()
+        Test.objects.filter(pk=test.pk).update(attempts_limit=attempts_limit)
+        test.refresh_from_db()
+        data = {
+            f'question_{question_id}': min(correct)
+            for question_id, (_, correct) in answer_key(test).items()
+        }
+        users = list(User.objects.filter(role='student').order_by('id'))
+        connection.close()
+        yield test, users, data
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        overrides.disable()
+        connection.settings_dict['TEST'] = old_test
+        connection.settings_dict['OPTIONS'] = old_options
+        teardown_test_environment()
+
+
+def _start(workers):
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return round(time.perf_counter() - started, 3)
+
+
+def run(threads=50, attempts=20, tuned=True, timeout=None):
+    """
+    Одновременная отправка попыток из потоков на файловой SQLite-БД.
+
+    Каждый поток — отдельный студент со своим соединением, как поток
+    Waitress. Возвращает статистику.
+    """
+    with stress_database(threads, tuned, timeout) as (test, users, data):
+        stats = {'inserted': 0, 'locked': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+        stats['seconds'] = _start([
+            threading.Thread(target=_worker, args=(barrier, test, user, data, attempts, tuned, stats, lock))
+            for user in users
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            stats['journal_mode'] = cursor.fetchone()[0]
+        stats['stored'] = TestAttempt.objects.count()
+        stats['summarized'] = TestResult.objects.aggregate(n=Sum('attempts'))['n'] or 0
+    stats['threads'] = threads
+    stats['attempted'] = threads * attempts
+    stats['per_second'] = round(stats['inserted'] / stats['seconds'], 1) if stats['seconds'] else 0
+    return stats
+
+
+def _limit_worker(barrier, test, user, data, tuned, stats, lock):
+    outcome = 'errors'
+    try:
+        barrier.wait()
+        score = grade_submission(test, data)['score']
+        if tuned:
+            accepted = reserve_attempt(user, test, score)['accepted']
+        else:
+            # Untuned baseline: the old read-check-insert of take_test
+            summary = TestResult.objects.filter(user=user, test=test).first()
+            accepted = (summary.attempts if summary else 0) < test.attempts_limit
+            if accepted:
+                with transaction.atomic():
+                    TestAttempt.objects.create(user=user, test=test, score=score)
+        outcome = 'accepted' if accepted else 'rejected'
+    except OperationalError as exc:
+        outcome = 'locked' if 'locked' in str(exc) or 'busy' in str(exc) else 'errors'
+    finally:
+        connections.close_all()
+        with lock:
+            stats[outcome] += 1
+
+
+def run_limit(threads=50, limit=3, tuned=True, timeout=None):
+    """
+    threads одновременных отправок одного студента по тесту с лимитом limit.
+
+    Проверяет, что принято не больше limit попыток: как двойной клик или
+    несколько вкладок, только сильнее. Возвращает статистику.
+    """
+    with stress_database(1, tuned, timeout, attempts_limit=limit) as (test, users, data):
+        user = users[0]
+        stats = {'accepted': 0, 'rejected': 0, 'locked': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+        stats['seconds'] = _start([
+            threading.Thread(target=_limit_worker, args=(barrier, test, user, data, tuned, stats, lock))
+            for _ in range(threads)
+        ])
+        stats['stored'] = TestAttempt.objects.filter(user=user, test=test).count()
+        summary = TestResult.objects.filter(user=user, test=test).first()
+        stats['summarized'] = summary.attempts if summary else 0
+    stats['threads'] = threads
+    stats['limit'] = limit
+    return stats
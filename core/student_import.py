@@ -0,0 +1,237 @@
+import codecs
+import csv
+import io
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError
+
+from .db import serialized_write
+from .models import StudyGroup, User
+
+try:
+    import openpyxl
+except Exception:
+    openpyxl = None
+
+# Accepted column titles -> User field
+COLUMNS = {
+    'username': 'username', 'login': 'username', 'логин': 'username',
+    'password': 'password', 'пароль': 'password',
+    'first_name': 'first_name', 'имя': 'first_name',
+    'last_name': 'last_name', 'фамилия': 'last_name',
+    'email': 'email', 'почта': 'email',
+    'group': 'group', 'группа': 'group',
+}
+
+SAMPLE_BYTES = 64 * 1024
+GENERATED_PASSWORD_BYTES = 6
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def detect_encoding(sample):
+    """utf-8-sig, если начало файла — корректный UTF-8, иначе cp1251."""
+    # Excel on Windows saves CSV in cp1251 unless told otherwise
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1251'
+
+
+def _csv_rows(fileobj, encoding=None):
+    sample = fileobj.read(SAMPLE_BYTES)
+    fileobj.seek(0)
+    encoding = encoding or detect_encoding(sample)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    try:
+        dialect = csv.Sniffer().sniff(sample.decode(encoding, errors='ignore').split('\n', 1)[0], delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(fileobj):
+    if openpyxl is None:
+        raise ImportFormatError('Для импорта XLSX установите openpyxl')
+    book = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in book.active.iter_rows(values_only=True):
+            yield ['' if value is None else str(value) for value in row]
+    finally:
+        book.close()
+
+
+def read_rows(fileobj, filename, encoding=None):
+    """Потоково читать CSV/XLSX: (номер строки, {поле: значение})."""
+    ext = os.path.splitext(filename)[1].lower()
+    rows = _xlsx_rows(fileobj) if ext in ('.xlsx', '.xlsm') else _csv_rows(fileobj, encoding)
+    header = None
+    for line, values in enumerate(rows, start=1):
+        if header is None:
+            header = [COLUMNS.get(title.strip().lower()) for title in values]
+            if 'username' not in header:
+                raise ImportFormatError('Нет столбца username/логин в первой строке')
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        yield line, {
+            field: value.strip()
+            for field, value in zip(header, values)
+            if field
+        }
+
+
+class StudentImporter:
+    """
+    Пакетный импорт студентов.
+
+    Строки проверяются пачками (существующие логины — одним запросом на
+    пачку), пароли хэшируются пулом потоков (PBKDF2 в hashlib отпускает GIL),
+    пачка вставляется одним bulk_create. Одинаковые заданные пароли
+    хэшируются один раз на импорт; пустой пароль генерируется.
+    """
+
+    def __init__(self, batch_size=500, workers=None, create_groups=True):
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 2
+        self.create_groups = create_groups
+        self.groups = dict(StudyGroup.objects.values_list('name', 'id'))
+        self.seen = set()
+        self.hashes = {}
+        self.result = {'created': 0, 'groups_created': 0, 'errors': [], 'generated': []}
+
+    def run(self, rows):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            self.pool = pool
+            batch = []
+            for line, row in rows:
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    self._import_batch(batch)
+                    batch = []
+            self._import_batch(batch)
+        return self.result
+
+    def _error(self, line, message):
+        self.result['errors'].append((line, message))
+
+    def _validate(self, batch):
+        usernames = [row.get('username', '') for _, row in batch]
+        taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        valid = []
+        for line, row in batch:
+            username = row.get('username', '')
+            if not username:
+                self._error(line, 'Пустой логин')
+                continue
+            if len(username) > 150:
+                self._error(line, 'Логин длиннее 150 символов')
+                continue
+            if username in taken:
+                self._error(line, f'Пользователь {username} уже существует')
+                continue
+            if username in self.seen:
+                self._error(line, f'Логин {username} повторяется в файле')
+                continue
+            email = row.get('email', '')
+            if email:
+                try:
+                    validate_email(email)
+                except ValidationError:
+                    self._error(line, f'Некорректный email: {email}')
+                    continue
+            group = row.get('group', '')
+            if group and group not in self.groups and not self.create_groups:
+                self._error(line, f'Группа {group} не найдена')
+                continue
+            self.seen.add(username)
+            valid.append((line, row))
+        return valid
+
+    def _ensure_groups(self, rows):
+        """
+        Создать недостающие группы пачки (в транзакции вставки пользователей).
+
+        Возвращает ({название: id} для новых для импорта групп, сколько
+        групп действительно вставлено).
+        """
+        missing = {row['group'] for _, row in rows if row.get('group') and row['group'] not in self.groups}
+        if not missing:
+            return {}, 0
+        existing = set(StudyGroup.objects.filter(name__in=missing).values_list('name', flat=True))
+        StudyGroup.objects.bulk_create([StudyGroup(name=name) for name in missing - existing])
+        return dict(StudyGroup.objects.filter(name__in=missing).values_list('name', 'id')), len(missing - existing)
+
+    def _hash_passwords(self, rows):
+        """(хэши по строкам, [(логин, сгенерированный пароль)])."""
+        passwords, generated = [], []
+        for _, row in rows:
+            password = row.get('password', '')
+            if password:
+                passwords.append((password, True))
+            else:
+                password = secrets.token_urlsafe(GENERATED_PASSWORD_BYTES)
+                generated.append((row['username'], password))
+                passwords.append((password, False))
+
+        # Passwords given in the file (often one default onboarding password)
+        # are hashed once per import; generated ones are all distinct
+        pending = list({password for password, given in passwords if given and password not in self.hashes})
+        self.hashes.update(zip(pending, self.pool.map(make_password, pending)))
+        unique_hashes = iter(self.pool.map(make_password, [password for password, given in passwords if not given]))
+        hashes = [self.hashes[password] if given else next(unique_hashes) for password, given in passwords]
+        return hashes, generated
+
+    def _import_batch(self, batch):
+        rows = self._validate(batch)
+        if not rows:
+            return
+        hashes, generated = self._hash_passwords(rows)
+        try:
+            # Groups and users of a batch commit or roll back together
+            with serialized_write():
+                groups, groups_created = self._ensure_groups(rows)
+                groups = {**self.groups, **groups}
+                users = [
+                    User(
+                        username=row['username'],
+                        password=password,
+                        first_name=row.get('first_name', '')[:150],
+                        last_name=row.get('last_name', '')[:150],
+                        email=row.get('email', ''),
+                        role='student',
+                        study_group_id=groups.get(row.get('group', '')),
+                    )
+                    for (_, row), password in zip(rows, hashes)
+                ]
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+        except IntegrityError:
+            # A login or group was taken concurrently; report the whole batch
+            for line, row in rows:
+                self._error(line, f'Не удалось создать {row["username"]}: конфликт при вставке пачки')
+            return
+        self.groups = groups
+        self.result['groups_created'] += groups_created
+        self.result['created'] += len(users)
+        self.result['generated'].extend(generated)
+
+
+def import_students(fileobj, filename, batch_size=500, workers=None, create_groups=True, encoding=None):
+    """Импортировать студентов из CSV/XLSX; возвращает счётчики, ошибки по строкам и сгенерированные пароли."""
+    importer = StudentImporter(batch_size=batch_size, workers=workers, create_groups=create_groups)
+    try:
+        return importer.run(read_rows(fileobj, filename, encoding))
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as exc:
+        importer.result['errors'].append((0, str(exc)))
+        return importer.result
@@ -0,0 +1,222 @@
+import os
+import random
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import content_cache
+from .models import (
+    Choice, Lecture, Module, Question, Schedule, StudyGroup, Subject, Test, TestAttempt, User,
+)
+from .results import rebuild_results
+
+# Per-parent counts: subjects per group, modules per subject, tests and lectures
+# per module, questions per test, students per group, max attempts per student
+# and test, schedule slots per working day
+SIZES = {
+    'tiny': dict(groups=1, subjects=2, modules=2, tests=2, lectures=1, questions=5, students=5, attempts=2, slots=2),
+    'small': dict(groups=3, subjects=4, modules=3, tests=2, lectures=1, questions=10, students=25, attempts=3, slots=3),
+    'medium': dict(groups=10, subjects=6, modules=4, tests=3, lectures=2, questions=20, students=30, attempts=3, slots=4),
+    'large': dict(groups=40, subjects=8, modules=4, tests=4, lectures=2, questions=25, students=40, attempts=3, slots=4),
+    # ~3000 students, 1200 tests, ~200k attempts
+    'production': dict(groups=60, subjects=5, modules=2, tests=2, lectures=2, questions=15, students=50, attempts=6, slots=4),
+}
+
+CHOICES_PER_QUESTION = 4
+STUDENT_PASSWORD = 'student'
+SLOT_TIMES = [time(8, 30), time(10, 10), time(11, 50), time(13, 30), time(15, 10), time(16, 50)]
+ROOMS = [f'{floor}{number:02d}' for floor in range(1, 5) for number in range(1, 11)]
+
+
+def _insert_sql(model, fields):
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(model._meta.get_field(name).column) for name in fields)
+    values = ', '.join(['%s'] * len(fields))
+    return f'INSERT INTO {qn(model._meta.db_table)} ({columns}) VALUES ({values})'
+
+
+def _execute_many(sql, rows):
+    if not rows:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _bulk(model, objs, batch_size):
+    for i in range(0, len(objs), batch_size):
+        model.objects.bulk_create(objs[i:i + batch_size], batch_size=batch_size)
+    return objs
+
+
+def generate(groups, subjects, modules, tests, questions, students, attempts,
+             lectures=0, slots=0, seed=0, batch_size=2000, prefix='bench'):
+    """
+    Сгенерировать синтетический колледж массовыми вставками.
+
+    Результат детерминирован для одного seed. Попытки сохраняются с
+    разбором ответов. Массовые вставки не шлют сигналов, поэтому в конце
+    сводки TestResult новых студентов перестраиваются, а кэши групп
+    сбрасываются явно. Файлы лекций (Markdown) пишутся в
+    MEDIA_ROOT/lectures/<prefix>/ после коммита структуры.
+    Возвращает словарь с количеством созданных объектов.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    lecture_files = []
+
+    with transaction.atomic():
+        group_objs = _bulk(StudyGroup, [StudyGroup(name=f'{prefix}-{g + 1:03d}') for g in range(groups)], batch_size)
+        subject_objs = _bulk(Subject, [
+            Subject(name=f'Предмет {s + 1}', group=group)
+            for group in group_objs for s in range(subjects)
+        ], batch_size)
+        module_objs = _bulk(Module, [
+            Module(name=f'Модуль {m + 1}', subject=subject)
+            for subject in subject_objs for m in range(modules)
+        ], batch_size)
+        test_objs = _bulk(Test, [
+            Test(name=f'Тест {t + 1}', module=module, attempts_limit=max(attempts, 1))
+            for module in module_objs for t in range(tests)
+        ], batch_size)
+        question_objs = _bulk(Question, [
+            Question(test=test, text=f'Вопрос {q + 1} теста {test.pk}')
+            for test in test_objs for q in range(questions)
+        ], batch_size)
+
+        choice_objs = []
+        for question in question_objs:
+            right = rng.randrange(CHOICES_PER_QUESTION)
+            for c in range(CHOICES_PER_QUESTION):
+                choice_objs.append(Choice(question=question, text=f'Вариант {c + 1}', correct=(c == right)))
+        _bulk(Choice, choice_objs, batch_size)
+
+        password = make_password(STUDENT_PASSWORD)
+        student_objs = _bulk(User, [
+            User(
+                username=f'{prefix}{g + 1:03d}s{n + 1:03d}',
+                first_name=f'Имя{n + 1}',
+                last_name=f'Фамилия{g + 1}-{n + 1}',
+                password=password,
+                role='student',
+                study_group=group,
+            )
+            for g, group in enumerate(group_objs) for n in range(students)
+        ], batch_size)
+
+        lecture_objs = _bulk(Lecture, [
+            Lecture(title=f'Лекция {n + 1}', module=module, file=_lecture_file(lecture_files, prefix, module, n, rng))
+            for module in module_objs for n in range(lectures)
+        ], batch_size)
+        through = Lecture.assigned_groups.through
+        _bulk(through, [
+            through(lecture_id=lecture.pk, studygroup_id=lecture.module.subject.group_id)
+            for lecture in lecture_objs
+        ], batch_size)
+
+        schedule_objs = []
+        for group in group_objs:
+            names = [subject.name for subject in subject_objs if subject.group_id == group.pk]
+            for day in range(1, 6):
+                for slot in SLOT_TIMES[:slots]:
+                    schedule_objs.append(Schedule(
+                        group=group,
+                        day_of_week=day,
+                        time=slot,
+                        subject=rng.choice(names) if names else 'Самоподготовка',
+                        room=rng.choice(ROOMS),
+                    ))
+        _bulk(Schedule, schedule_objs, batch_size)
+        # A rollback must not leave orphan files in MEDIA_ROOT
+        transaction.on_commit(lambda: _write_lectures(lecture_files))
+
+    # Answer key per test: [(question id as JSON key, [choice ids], correct choice id)]
+    keys = {}
+    for i, question in enumerate(question_objs):
+        block = choice_objs[i * CHOICES_PER_QUESTION:(i + 1) * CHOICES_PER_QUESTION]
+        correct_id = next(c.pk for c in block if c.correct)
+        keys.setdefault(question.test_id, []).append((str(question.pk), [c.pk for c in block], correct_id))
+
+    tests_by_group = {}
+    for test in test_objs:
+        tests_by_group.setdefault(test.module.subject.group_id, []).append(test)
+
+    # Attempts go straight to executemany: at this volume ORM instance
+    # construction dominates
+    ops = connection.ops
+    attempt_sql = _insert_sql(TestAttempt, ['user', 'test', 'score', 'answers', 'created'])
+    attempt_count = 0
+    batch = []
+    random_float = rng.random
+    for student in student_objs:
+        student_id = student.pk
+        skill = rng.uniform(0.3, 0.95)
+        for test in tests_by_group.get(student.study_group_id, []):
+            test_id = test.pk
+            key = keys.get(test_id, [])
+            n = rng.randint(0, attempts)
+            times = sorted(now - timedelta(minutes=rng.randint(0, 60 * 24 * 120)) for _ in range(n))
+            for created in times:
+                answers = {}
+                correct = 0
+                for question_id, choice_ids, correct_id in key:
+                    if random_float() < skill:
+                        choice_id = correct_id
+                    else:
+                        choice_id = choice_ids[int(random_float() * len(choice_ids))]
+                    ok = choice_id == correct_id
+                    correct += ok
+                    answers[question_id] = {'choice': choice_id, 'correct': ok}
+                total = len(key)
+                score = (correct / total) * 100 if total else 0
+                batch.append((
+                    student_id, test_id, score,
+                    ops.adapt_json_value(answers, None),
+                    ops.adapt_datetimefield_value(created),
+                ))
+                if len(batch) >= batch_size:
+                    _execute_many(attempt_sql, batch)
+                    attempt_count += len(batch)
+                    batch = []
+    _execute_many(attempt_sql, batch)
+    attempt_count += len(batch)
+
+    # executemany and bulk_create bypass the signals that maintain these
+    rebuild_results(batch_size=batch_size, users=User.objects.filter(study_group__in=group_objs))
+    group_ids = [group.pk for group in group_objs]
+    content_cache.bump(content_cache.TREE, *group_ids)
+    content_cache.bump(content_cache.SCHEDULE, *group_ids)
+
+    return {
+        'groups': len(group_objs),
+        'subjects': len(subject_objs),
+        'modules': len(module_objs),
+        'tests': len(test_objs),
+        'questions': len(question_objs),
+        'choices': len(choice_objs),
+        'students': len(student_objs),
+        'attempts': attempt_count,
+        'lectures': len(lecture_objs),
+        'schedules': len(schedule_objs),
+    }
+
+
+def _lecture_file(files, prefix, module, n, rng):
+    """Имя файла лекции; текст откладывается в files до записи на диск."""
+    name = f'lectures/{prefix}/{module.pk}-{n + 1}.md'
+    paragraphs = rng.randint(5, 40)
+    parts = [f'# {module.name}: лекция {n + 1}\n\n']
+    for p in range(paragraphs):
+        parts.append(f'## Раздел {p + 1}\n\n' + 'Текст раздела лекции. ' * rng.randint(10, 80) + '\n\n')
+    files.append((name, ''.join(parts)))
+    return name
+
+
+def _write_lectures(files):
+    for name, text in files:
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
@@ -0,0 +1,422 @@
+import io
+import threading
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.template import TemplateDoesNotExist, engines
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import checks, content_cache, item_analysis, query_plans, question_bank, timetable, user_directory
+from .file_serving import _parse_range
+from .grading import answer_key, grade_submission
+from .models import (
+    Choice, Lecture, Module, Question, Schedule, StudyGroup, Subject, Test, TestAttempt, TestItemStats, TestResult,
+    User,
+)
+from .results import record_attempt, reserve_attempt
+from .student_import import StudentImporter
+
+
+def make_course(tests=2, questions=2):
+    """Группа с предметом, модулем и тестами (у каждого вопроса — верный и неверный вариант)."""
+    group = StudyGroup.objects.create(name='ИС-21')
+    subject = Subject.objects.create(name='Математика', group=group)
+    module = Module.objects.create(name='Модуль 1', subject=subject)
+    for number in range(tests):
+        test = Test.objects.create(name=f'Тест {number}', module=module)
+        for question_number in range(questions):
+            question = Question.objects.create(test=test, text=f'Вопрос {question_number}')
+            Choice.objects.create(question=question, text='Да', correct=True)
+            Choice.objects.create(question=question, text='Нет')
+    return group, subject, module
+
+
+def make_students(group, count, start=0):
+    return [
+        User.objects.create_user(username=f'student{number}', password='x', role='student', study_group=group)
+        for number in range(start, start + count)
+    ]
+
+
+def page_queries(client, url):
+    """Число запросов страницы (после прогревающего запроса)."""
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    return len(context)
+
+
+def make_admin():
+    return User.objects.create_user(username='admin', password='x', role='admin', is_staff=True)
+
+
+class GradebookQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group, cls.subject, cls.module = make_course()
+        cls.tests = list(Test.objects.filter(module=cls.module))
+        cls.admin = make_admin()
+
+    def add_attempts(self, students, per_test):
+        for student in students:
+            for test in self.tests:
+                for score in range(per_test):
+                    record_attempt(student, test, score * 10)
+
+    def test_query_count_does_not_grow_with_students_or_attempts(self):
+        self.client.force_login(self.admin)
+        url = reverse('core:admin_journal_subject_detail', args=[self.subject.id])
+        self.add_attempts(make_students(self.group, 2), per_test=1)
+        small = page_queries(self.client, url)
+
+        self.add_attempts(make_students(self.group, 10, start=2), per_test=3)
+        with self.assertNumQueries(small):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['matrix']), 12)
+
+
+class StudentPageQueriesTests(TestCase):
+    """Число запросов страниц студента не растёт с количеством лекций, тестов и вопросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group, cls.subject, cls.module = make_course(tests=1, questions=2)
+        cls.test = Test.objects.get(module=cls.module)
+        cls.student = make_students(cls.group, 1)[0]
+        cls.add_lectures(2)
+
+    @classmethod
+    def add_lectures(cls, count):
+        for _ in range(count):
+            number = Lecture.objects.count()
+            lecture = Lecture.objects.create(title=f'Лекция {number}', file=f'lectures/{number}.pdf', module=cls.module)
+            lecture.assigned_groups.add(cls.group)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def assert_constant_queries(self, url, grow):
+        small = page_queries(self.client, url)
+        with self.captureOnCommitCallbacks(execute=True):
+            grow()
+        self.assertEqual(page_queries(self.client, url), small)
+
+    def test_module_detail(self):
+        def grow():
+            self.add_lectures(5)
+            for number in range(3):
+                Test.objects.create(name=f'Ещё тест {number}', module=self.module)
+
+        self.assert_constant_queries(reverse('core:module_detail', args=[self.module.id]), grow)
+
+    def test_lectures_list(self):
+        def grow():
+            other = Module.objects.create(name='Модуль 2', subject=self.subject)
+            for number in range(5):
+                lecture = Lecture.objects.create(title=f'Доп. {number}', file=f'lectures/x{number}.pdf', module=other)
+                lecture.assigned_groups.add(self.group)
+
+        self.assert_constant_queries(reverse('core:lectures_list'), grow)
+
+    def test_take_test(self):
+        def grow():
+            for number in range(5):
+                question = Question.objects.create(test=self.test, text=f'Доп. вопрос {number}')
+                Choice.objects.create(question=question, text='Да', correct=True)
+                Choice.objects.create(question=question, text='Нет')
+
+        self.assert_constant_queries(reverse('core:take_test', args=[self.test.id]), grow)
+
+
+class ConcurrentAttemptsTests(TransactionTestCase):
+    """Одновременные отправки из потоков, каждый со своим соединением, как потоки Waitress."""
+    threads = 50
+
+    def setUp(self):
+        self.group, _, module = make_course(tests=1, questions=10)
+        self.test = Test.objects.get(module=module)
+        self.data = {
+            f'question_{question_id}': min(correct)
+            for question_id, (_, correct) in answer_key(self.test).items()
+        }
+
+    def run_threads(self, target, args_list):
+        """Запустить target(*args) в потоках одновременно; вернуть исключения потоков."""
+        barrier = threading.Barrier(len(args_list))
+        errors = []
+
+        def worker(*args):
+            try:
+                barrier.wait()
+                target(*args)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=args) for args in args_list]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return errors
+
+    def submit(self, user, attempts):
+        for _ in range(attempts):
+            graded = grade_submission(self.test, self.data)
+            reserve_attempt(user, self.test, graded['score'], graded['answers'])
+
+    def test_parallel_students_never_hit_database_is_locked(self):
+        Test.objects.filter(pk=self.test.pk).update(attempts_limit=100)
+        self.test.refresh_from_db()
+        students = User.objects.bulk_create([
+            User(username=f'student{number}', role='student', study_group=self.group)
+            for number in range(self.threads)
+        ])
+        errors = self.run_threads(self.submit, [(student, 5) for student in students])
+
+        self.assertEqual([exc for exc in errors if isinstance(exc, OperationalError)], [])
+        self.assertEqual(errors, [])
+        stored = TestAttempt.objects.count()
+        self.assertEqual(stored, self.threads * 5)
+        self.assertEqual(TestResult.objects.aggregate(n=Sum('attempts'))['n'], stored)
+
+    def test_one_student_in_parallel_never_exceeds_the_limit(self):
+        Test.objects.filter(pk=self.test.pk).update(attempts_limit=3)
+        self.test.refresh_from_db()
+        student = make_students(self.group, 1)[0]
+        errors = self.run_threads(self.submit, [(student, 1)] * self.threads)
+
+        self.assertEqual(errors, [])
+        stored = TestAttempt.objects.filter(user=student).count()
+        summarized = TestResult.objects.get(user=student, test=self.test).attempts
+        self.assertEqual((stored, summarized), (3, 3))
+
+    def test_rejected_attempt_writes_nothing(self):
+        Test.objects.filter(pk=self.test.pk).update(attempts_limit=0)
+        self.test.refresh_from_db()
+        student = make_students(self.group, 1)[0]
+        reservation = reserve_attempt(student, self.test, 100)
+
+        self.assertFalse(reservation['accepted'])
+        self.assertFalse(TestResult.objects.filter(user=student).exists())
+        self.assertFalse(TestAttempt.objects.filter(user=student).exists())
+
+
+class ServerTimingTests(TestCase):
+    def test_only_staff_and_administrators_get_the_header(self):
+        group, subject, _ = make_course(tests=0)
+        url = reverse('core:subject_detail', args=[subject.id])
+        self.assertNotIn('Server-Timing', self.client.get(reverse('core:login')))
+
+        self.client.force_login(make_students(group, 1)[0])
+        self.assertNotIn('Server-Timing', self.client.get(url))
+
+        self.client.force_login(make_admin())
+        self.assertIn('sql;dur=', self.client.get(url)['Server-Timing'])
+
+    def test_missing_template_is_reported_by_the_timed_backend(self):
+        backend = engines.all()[0]
+        with self.assertRaises(TemplateDoesNotExist) as context:
+            backend.get_template('core/no-such-template.html')
+        self.assertIs(context.exception.backend, backend)
+
+
+class QueryPlanTests(TestCase):
+    def test_scan_pattern(self):
+        plan = (
+            'SCAN core_testattempt USING INDEX attempt_test_user_idx\n'
+            'SCAN core_testresult USING COVERING INDEX x\n'
+            'SCAN core_schedule'
+        )
+        self.assertEqual(query_plans.TABLE_SCAN_RE.findall(plan), ['core_schedule'])
+        self.assertEqual(query_plans.table_scans(plan), ['core_schedule'])
+
+    def test_hot_queries_do_not_scan_large_tables(self):
+        group, subject, module = make_course(tests=3, questions=2)
+        tests = list(Test.objects.filter(module=module))
+        students = make_students(group, 3)
+        for student in students:
+            for test in tests:
+                record_attempt(student, test, 50)
+        plans = query_plans.collect(students[0], tests[0], subject, group)
+        scans = {name: plan['plan'] for name, plan in plans.items() if plan['table_scans']}
+        self.assertEqual(scans, {})
+
+
+class StudentImportTests(TestCase):
+    def test_counts_only_groups_it_inserted(self):
+        importer = StudentImporter(workers=1)
+        # Created by someone else after the importer loaded the group list
+        group = StudyGroup.objects.create(name='ИС-22')
+        result = importer.run([
+            (2, {'username': 'ivanov', 'password': 'x', 'group': 'ИС-22'}),
+            (3, {'username': 'petrov', 'password': 'x', 'group': 'ИС-23'}),
+        ])
+        self.assertEqual((result['created'], result['groups_created']), (2, 1))
+        self.assertEqual(User.objects.get(username='ivanov').study_group, group)
+        self.assertTrue(User.objects.filter(username='petrov', study_group__name='ИС-23').exists())
+
+    def test_failed_batch_leaves_no_groups(self):
+        class ConflictingImporter(StudentImporter):
+            def _hash_passwords(self, rows):
+                # The login is taken between validation and insert
+                User.objects.create(username=rows[0][1]['username'])
+                return super()._hash_passwords(rows)
+
+        result = ConflictingImporter(workers=1).run([(2, {'username': 'sidorov', 'password': 'x', 'group': 'ИС-24'})])
+        self.assertEqual((result['created'], result['groups_created']), (0, 0))
+        self.assertEqual(len(result['errors']), 1)
+        self.assertFalse(StudyGroup.objects.filter(name='ИС-24').exists())
+
+
+class QuestionBankExportTests(TestCase):
+    def setUp(self):
+        _, _, module = make_course(tests=1, questions=1)
+        self.test = Test.objects.get(module=module)
+        self.target = Test.objects.create(name='Импорт', module=module)
+
+    def add_question(self, text, choices):
+        question = Question.objects.create(test=self.test, text=text)
+        Choice.objects.bulk_create([Choice(question=question, text=body, correct=correct) for body, correct in choices])
+        return question.pk
+
+    def test_exported_bank_imports_back(self):
+        long_choice = self.add_question('Длинный вариант', [('x' * 256, True), ('Нет', False)])
+        skipped = {
+            self.add_question('Один вариант', [('Да', True)]): 'нужно не меньше двух вариантов ответа',
+            self.add_question('Без ответа', [('Да', False), ('Нет', False)]): 'нет правильного варианта',
+            self.add_question('   ', [('Да', True), ('Нет', False)]): 'пустой текст вопроса',
+            self.add_question('Пустой вариант', [('Да', True), (' ', False)]): 'пустой вариант ответа',
+            long_choice: 'вариант длиннее 255 символов',
+        }
+        aiken_only = {
+            self.add_question('Вопрос\nA. не вариант', [('Да', True), ('Нет', False)]):
+                'строка текста похожа на вариант ответа или ANSWER',
+            self.add_question('Вопрос\nANSWER: B', [('Да', True), ('Нет', False)]):
+                'строка текста похожа на вариант ответа или ANSWER',
+            self.add_question('Много вариантов', [(str(n), n == 0) for n in range(27)]): 'больше 26 вариантов ответа',
+        }
+        self.assertEqual(dict(question_bank.export_problems(self.test, 'json')), skipped)
+        self.assertEqual(dict(question_bank.export_problems(self.test, 'aiken')), {**skipped, **aiken_only})
+
+        for fmt, expected in (('aiken', 1), ('json', 1 + len(aiken_only))):
+            exported = ''.join(question_bank.export_questions(self.test, fmt)).encode()
+            imported = question_bank.import_questions(self.target, io.BytesIO(exported), fmt, replace=True)
+            self.assertEqual(imported[0], expected)
+
+        self.client.force_login(make_admin())
+        response = self.client.get(reverse('core:admin_test_detail', args=[self.test.id]))
+        self.assertEqual([number for number, _ in response.context['aiken_skipped']], list(range(2, 10)))
+        self.assertEqual([number for number, _ in response.context['json_skipped']], list(range(2, 7)))
+
+
+class UserDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='ivanov.p', first_name='Пётр', last_name='Иванов')
+        User.objects.create(username='Sidorova', first_name='Анна', last_name='Семёнова')
+        # bulk_create fills the search keys too (student import, generate_data)
+        User.objects.bulk_create([User(username='petrov', first_name='Иван', last_name='Петров')])
+
+    def found(self, query):
+        users, _, _ = user_directory.search_users(query=query)
+        return [user.username for user in users]
+
+    def test_search_ignores_case_in_every_field(self):
+        self.assertEqual(self.found('иванов'), ['ivanov.p'])
+        self.assertEqual(self.found('ИВАН'), ['ivanov.p', 'petrov'])
+        self.assertEqual(self.found('sidor'), ['Sidorova'])
+        self.assertEqual(self.found('IVANOV'), ['ivanov.p'])
+
+    def test_yo_matches_ye(self):
+        self.assertEqual(self.found('семенова'), ['Sidorova'])
+        self.assertEqual(self.found('пет'), ['ivanov.p', 'petrov'])
+
+
+class StudentJournalSubjectTests(TestCase):
+    def test_history_survives_a_group_change(self):
+        group, subject, module = make_course(tests=1)
+        student = make_students(group, 1)[0]
+        record_attempt(student, Test.objects.get(module=module), 80)
+        student.study_group = StudyGroup.objects.create(name='ИС-22')
+        student.save()
+        other = Subject.objects.create(name='Физика', group=student.study_group)
+
+        self.client.force_login(student)
+        response = self.client.get(reverse('core:student_journal_subject', args=[subject.id]))
+        self.assertEqual(len(response.context['attempts']), 1)
+        self.assertEqual(self.client.get(reverse('core:student_journal_subject', args=[other.id])).status_code, 404)
+
+
+class TimetableImportTests(TestCase):
+    def test_semicolon_wins_over_commas_in_the_subject(self):
+        slots, errors = timetable.parse_week('Пн;09:00;Математика, лекция;101\nВт;10:30;Физика;202')
+        self.assertEqual(errors, [])
+        self.assertEqual([(subject, room) for *_, subject, room in slots], [('Математика, лекция', '101'), ('Физика', '202')])
+
+    def test_comma_and_tab_are_still_sniffed(self):
+        for text in ('Пн,09:00,Математика,101', 'Пн\t09:00\tМатематика\t101'):
+            slots, errors = timetable.parse_week(text)
+            self.assertEqual((errors, slots[0][3:]), ([], ('Математика', '101')))
+
+    def test_cp1251_upload(self):
+        group = StudyGroup.objects.create(name='ИС-21')
+        self.client.force_login(make_admin())
+        upload = SimpleUploadedFile('week.csv', 'Пн;09:00;Математика;101'.encode('cp1251'))
+        self.client.post(reverse('core:admin_schedule_group', args=[group.id]), {'action': 'import', 'file': upload})
+        self.assertEqual(list(Schedule.objects.values_list('subject', flat=True)), ['Математика'])
+
+
+@unittest.skipIf(item_analysis.np is None, 'numpy is not installed')
+class ItemAnalysisPageTests(TestCase):
+    def test_get_only_reads_and_post_recomputes(self):
+        group, _, module = make_course(tests=1)
+        test = Test.objects.get(module=module)
+        record_attempt(make_students(group, 1)[0], test, 100, grade_submission(test, {})['answers'])
+        self.client.force_login(make_admin())
+        url = reverse('core:admin_test_analysis', args=[test.id])
+
+        response = self.client.get(url)
+        self.assertIsNone(response.context['stats'])
+        self.assertFalse(TestItemStats.objects.exists())
+
+        self.assertRedirects(self.client.post(url), url)
+        self.assertEqual(self.client.get(url).context['stats'].attempts, 1)
+
+
+class ContentCacheTests(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    FILE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/x'}}
+
+    def test_per_process_cache_is_refused_with_several_workers(self):
+        with override_settings(CACHES=self.LOCMEM, SERVER_WORKERS=4):
+            self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['core.E001'])
+        with override_settings(CACHES=self.LOCMEM, SERVER_WORKERS=1):
+            self.assertEqual(checks.check_shared_cache(None), [])
+        with override_settings(CACHES=self.FILE, SERVER_WORKERS=4):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+    def test_bump_never_reuses_a_version(self):
+        seen = {content_cache.version(content_cache.TREE, 1)}
+        for _ in range(3):
+            content_cache.bump(content_cache.TREE, 1)
+            seen.add(content_cache.version(content_cache.TREE, 1))
+        self.assertEqual(len(seen), 4)
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_suffix_range(self):
+        self.assertEqual(_parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(_parse_range('bytes=-10', 5), (0, 4))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(_parse_range('bytes=-10', 0), 'invalid')
+        self.assertEqual(_parse_range('bytes=0-', 0), 'invalid')
+        self.assertEqual(_parse_range('bytes=-0', 100), 'invalid')
+        self.assertEqual(_parse_range('bytes=100-', 100), 'invalid')
@@ -0,0 +1,198 @@
+import csv
+import datetime
+import re
+from collections import defaultdict
+
+from . import content_cache
+from .db import serialized_write
+from .models import DAY_CHOICES, DAY_NAMES, Schedule
+
+# Monday to Saturday are always shown in the grid, Sunday only when used
+GRID_DAYS = 6
+
+
+def _day_aliases():
+    aliases = {}
+    short = (('пн', 'mon'), ('вт', 'tue'), ('ср', 'wed'), ('чт', 'thu'), ('пт', 'fri'), ('сб', 'sat'), ('вс', 'sun'))
+    for (number, name), names in zip(DAY_CHOICES, short):
+        for alias in (str(number), name.lower(), *names):
+            aliases[alias] = number
+    return aliases
+
+
+# Accepted spellings of a day in imports: 1, «Понедельник», «Пн», «Mon»
+DAY_ALIASES = _day_aliases()
+
+TIME_RE = re.compile(r'^(\d{1,2})[:.](\d{2})$')
+HEADER_WORDS = {'день', 'day', 'день недели'}
+
+
+class SemicolonDialect(csv.excel):
+    delimiter = ';'
+
+
+SUBJECT_MAX_LENGTH = Schedule._meta.get_field('subject').max_length
+ROOM_MAX_LENGTH = Schedule._meta.get_field('room').max_length
+
+
+def _build_grid(group_id):
+    slots = content_cache.group_schedule(group_id)
+    days = [day for day, _ in DAY_CHOICES[:GRID_DAYS]]
+    days += sorted({slot.day_of_week for slot in slots} - set(days))
+    cells = {(slot.day_of_week, slot.time): slot for slot in slots}
+    return {
+        'days': [(day, DAY_NAMES.get(day, day)) for day in days],
+        'rows': [
+            {'time': time, 'cells': [cells.get((day, time)) for day in days]}
+            for time in sorted({slot.time for slot in slots})
+        ],
+    }
+
+
+def group_grid(group_id):
+    """
+    Недельная сетка группы: дни — столбцы, время начала — строки.
+
+    {'days': [(номер, название)], 'rows': [{'time': t, 'cells': [Schedule | None]}]};
+    кэшируется вместе с расписанием группы и сбрасывается при его изменении.
+    """
+    return content_cache.cached(content_cache.SCHEDULE, group_id, _build_grid, name='-grid')
+
+
+def room_key(room):
+    """Кабинет для сравнения: «101 », «101» и « 101» — один кабинет."""
+    return ' '.join(room.split()).casefold()
+
+
+def _build_conflicts(_):
+    index = defaultdict(list)
+    rows = (
+        Schedule.objects.exclude(room='')
+        .order_by('day_of_week', 'time', 'room', 'group__name')
+        .values_list('id', 'group_id', 'group__name', 'day_of_week', 'time', 'subject', 'room')
+    )
+    for schedule_id, group_id, group_name, day, time, subject, room in rows:
+        index[(day, time, room_key(room))].append({
+            'id': schedule_id, 'group_id': group_id, 'group': group_name, 'subject': subject, 'room': room,
+        })
+    return [
+        {'day': day, 'day_name': DAY_NAMES.get(day, day), 'time': time, 'room': ' '.join(entries[0]['room'].split()),
+         'entries': entries}
+        for (day, time, _), entries in index.items()
+        if len(entries) > 1
+    ]
+
+
+def room_conflicts(group_id=None):
+    """
+    Занятия разных групп в одном кабинете в одно время.
+
+    Индекс (день, время, кабинет) строится одним проходом по расписанию
+    всех групп и кэшируется до любого изменения расписания. С group_id —
+    только конфликты с участием этой группы.
+    """
+    conflicts = content_cache.cached(
+        content_cache.SCHEDULE, content_cache.ALL_GROUPS, _build_conflicts, name='-rooms'
+    )
+    if group_id is None:
+        return conflicts
+    return [
+        conflict for conflict in conflicts
+        if any(entry['group_id'] == group_id for entry in conflict['entries'])
+    ]
+
+
+def conflicting_ids(conflicts):
+    return {entry['id'] for conflict in conflicts for entry in conflict['entries']}
+
+
+def parse_day(value):
+    return DAY_ALIASES.get(value.strip().lower().rstrip('.'))
+
+
+def parse_time(value):
+    match = TIME_RE.match(value.strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return datetime.time(hour, minute)
+
+
+def parse_week(text):
+    """
+    Разобрать недельное расписание: строки «день;время;предмет;кабинет»
+    (разделитель ; , или табуляция, кабинет необязателен, первая строка
+    может быть заголовком). Возвращает (slots, errors) с номерами строк.
+    """
+    lines = text.splitlines()
+    sample = next((line for line in lines if line.strip()), '')
+    # A subject may contain commas («Математика, лекция»), so ; wins whenever
+    # it is there; the sniffer only tells , from a tab
+    dialect = SemicolonDialect
+    if ';' not in sample:
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',\t')
+        except csv.Error:
+            pass
+    slots, errors, seen = [], [], {}
+    for number, row in enumerate(csv.reader(lines, dialect), start=1):
+        row = [value.strip() for value in row]
+        if not any(row):
+            continue
+        if not slots and not errors and row[0].lower() in HEADER_WORDS:
+            continue
+        if len(row) < 3:
+            errors.append((number, 'Нужно не меньше трёх полей: день, время, предмет'))
+            continue
+        day, time = parse_day(row[0]), parse_time(row[1])
+        subject, room = row[2], row[3] if len(row) > 3 else ''
+        if day is None:
+            errors.append((number, f'Неизвестный день недели: {row[0]}'))
+        elif time is None:
+            errors.append((number, f'Некорректное время: {row[1]} (нужно ЧЧ:ММ)'))
+        elif not subject:
+            errors.append((number, 'Пустой предмет'))
+        elif len(subject) > SUBJECT_MAX_LENGTH or len(room) > ROOM_MAX_LENGTH:
+            errors.append((number, 'Слишком длинный предмет или кабинет'))
+        elif (day, time) in seen:
+            errors.append((number, f'{DAY_NAMES[day]} {time:%H:%M} уже занято в строке {seen[(day, time)]}'))
+        else:
+            seen[(day, time)] = number
+            slots.append((number, day, time, subject, room))
+    return slots, errors
+
+
+def import_week(group, text, replace=False):
+    """
+    Загрузить недельное расписание группы одной транзакцией.
+
+    При любой ошибке ничего не сохраняется. replace=True сначала удаляет
+    текущее расписание группы, иначе занятые слоты группы считаются
+    ошибками. Возвращает created, deleted, errors [(строка, сообщение)] и
+    конфликты кабинетов с участием группы после загрузки.
+    """
+    slots, errors = parse_week(text)
+    result = {'created': 0, 'deleted': 0, 'errors': errors, 'conflicts': []}
+    if not replace:
+        taken = set(Schedule.objects.filter(group=group).values_list('day_of_week', 'time'))
+        for number, day, time, _, _ in slots:
+            if (day, time) in taken:
+                errors.append((number, f'{DAY_NAMES[day]} {time:%H:%M} уже есть в расписании группы'))
+    if errors or not slots:
+        errors.sort()
+        return result
+
+    with serialized_write():
+        if replace:
+            result['deleted'], _ = Schedule.objects.filter(group=group).delete()
+        Schedule.objects.bulk_create([
+            Schedule(group=group, day_of_week=day, time=time, subject=subject, room=room)
+            for _, day, time, subject, room in slots
+        ])
+        # bulk_create sends no post_save
+        content_cache.invalidate(content_cache.SCHEDULE, group.id)
+    result['created'] = len(slots)
+    result['conflicts'] = room_conflicts(group.id)
+    return result
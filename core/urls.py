@@ -11,22 +11,32 @@ urlpatterns = [
     path('subject/<int:subject_id>/', views.subject_detail, name='subject_detail'),
     path('module/<int:module_id>/', views.module_detail, name='module_detail'),
     path('student-journal/', views.student_journal, name='student_journal'),
+    path('student-journal/<int:subject_id>/', views.student_journal_subject, name='student_journal_subject'),
     path('lectures/', views.lectures_list, name='lectures_list'),
     path('lecture/<int:pk>/', views.lecture_detail, name='lecture_detail'),
+    path('lecture/<int:pk>/file/', views.lecture_file, name='lecture_file'),
     path('test/<int:test_id>/', views.take_test, name='take_test'),
     
     # Admin panel
     path('admin-panel/', views.admin_panel, name='admin_panel'),
     path('admin-users/', views.admin_users, name='admin_users'),
+    path('admin-users/import/', views.admin_users_import, name='admin_users_import'),
+    path('admin-users/json/', views.admin_users_json, name='admin_users_json'),
     path('admin-groups/', views.admin_groups, name='admin_groups'),
     path('admin-group/<int:group_id>/', views.admin_group_detail, name='admin_group_detail'),
     path('admin-subject/<int:subject_id>/', views.admin_subject_detail, name='admin_subject_detail'),
     path('admin-module/<int:module_id>/', views.admin_module_detail, name='admin_module_detail'),
     path('admin-test/<int:test_id>/', views.admin_test_detail, name='admin_test_detail'),
+    path('admin-test/<int:test_id>/export/', views.admin_test_export, name='admin_test_export'),
+    path('admin-test/<int:test_id>/analysis/', views.admin_test_analysis, name='admin_test_analysis'),
     path('admin-journal/', views.admin_journal, name='admin_journal'),
+    path('admin-journal/export/', views.admin_journal_export, name='admin_journal_export'),
     path('admin-journal-group/<int:group_id>/', views.admin_journal_group_detail, name='admin_journal_group_detail'),
+    path('admin-journal-group/<int:group_id>/export/', views.admin_journal_export, name='admin_journal_group_export'),
     path('admin-journal-subject/<int:subject_id>/', views.admin_journal_subject_detail, name='admin_journal_subject_detail'),
+    path('admin-journal-subject/<int:subject_id>/export/', views.admin_journal_export, name='admin_journal_subject_export'),
     path('admin-schedule/', views.admin_schedule, name='admin_schedule'),
     path('admin-schedule-group/<int:group_id>/', views.admin_schedule_group, name='admin_schedule_group'),
+    path('admin-metrics/', views.admin_metrics, name='admin_metrics'),
 ]
 
@@ -0,0 +1,18 @@
+from django.urls import URLPattern
+
+from . import async_views, urls
+
+app_name = urls.app_name
+
+ASYNC_VIEWS = {
+    'index': async_views.index,
+    'lectures_list': async_views.lectures_list,
+    'lecture_detail': async_views.lecture_detail,
+    'student_journal': async_views.student_journal,
+}
+
+# Same routes and names as core.urls; the read-heavy pages get async views
+urlpatterns = [
+    URLPattern(pattern.pattern, ASYNC_VIEWS.get(pattern.name, pattern.callback), pattern.default_args, pattern.name)
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,61 @@
+from django.db.models import Q
+
+from .models import User, search_key
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Upper bound for "starts with" ranges: prefix <= value < prefix + PREFIX_END
+PREFIX_END = '\U0010ffff'
+
+
+def _prefix(field, value):
+    # A range instead of LIKE so SQLite can walk the index on the column
+    return Q(**{f'{field}__gte': value, f'{field}__lt': value + PREFIX_END})
+
+
+def search_users(role=None, group_id=None, query='', after=None, before=None, limit=PAGE_SIZE):
+    """
+    Страница каталога пользователей с keyset-пагинацией по логину.
+
+    after — последний логин предыдущей страницы (вперёд), before — первый
+    логин следующей (назад). query ищет по началу логина, имени или фамилии
+    без учёта регистра (по копиям полей SearchKeyField).
+    Возвращает (users, есть_ещё_вперёд, есть_ещё_назад).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    users = User.objects.select_related('study_group').only(
+        'id', 'username', 'first_name', 'last_name', 'email', 'role', 'study_group__name',
+    )
+    if role:
+        users = users.filter(role=role)
+    if group_id:
+        users = users.filter(study_group_id=group_id)
+    query = search_key(query.strip())
+    if query:
+        users = users.filter(
+            _prefix('username_key', query) | _prefix('first_name_key', query) | _prefix('last_name_key', query)
+        )
+
+    if before is not None:
+        page = list(users.filter(username__lt=before).order_by('-username')[:limit + 1])
+        has_prev = len(page) > limit
+        page = page[:limit][::-1]
+        return page, True, has_prev
+
+    if after is not None:
+        users = users.filter(username__gt=after)
+    page = list(users.order_by('username')[:limit + 1])
+    return page[:limit], len(page) > limit, after is not None
+
+
+def as_json(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'role': user.role,
+        'group': user.study_group.name if user.study_group_id else None,
+    }
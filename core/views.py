@@ -1,15 +1,23 @@
 import os
+import time
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import logout
 from django.conf import settings
-from .models import Lecture, Test, Choice, TestAttempt, User, StudyGroup, Module, Question, Subject
-import markdown as md
-
-try:
-    import mammoth
-except Exception:
-    mammoth = None
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db.models import Count
+from django.urls import reverse
+from urllib.parse import urlencode
+from .models import Lecture, Test, TestAttempt, TestResult, User, StudyGroup, Module, Question, Subject
+from . import content_cache, gradebook_export, item_analysis, journal, metrics, question_bank, timetable, user_directory
+from .access import can_view
+from .file_serving import serve_file
+from .gradebook import subject_gradebook
+from .grading import grade_submission
+from .lecture_render import cached_html, render_lecture
+from .render_queue import is_pending
+from .results import reserve_attempt
+from .student_import import detect_encoding, import_students
 
 
 def logout_view(request):
@@ -25,9 +33,12 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def admin_schedule(request):
-    """Список групп для редактирования расписания"""
-    groups = StudyGroup.objects.all().order_by('name')
-    return render(request, 'core/admin/schedule_groups.html', {'groups': groups})
+    """Список групп для редактирования расписания и конфликты кабинетов"""
+    groups = StudyGroup.objects.annotate(student_count=Count('user')).order_by('name')
+    return render(request, 'core/admin/schedule_groups.html', {
+        'groups': groups,
+        'conflicts': timetable.room_conflicts(),
+    })
 
 
 @login_required
@@ -37,12 +48,19 @@ def admin_schedule_group(request, group_id):
     from .models import Schedule
     
     group = get_object_or_404(StudyGroup, id=group_id)
-    schedules = Schedule.objects.filter(group=group).order_by('day_of_week', 'time')
+    import_result = None
     
     if request.method == 'POST':
         action = request.POST.get('action')
         
-        if action == 'add':
+        if action == 'import':
+            text = request.POST.get('text', '')
+            if request.FILES.get('file'):
+                data = request.FILES['file'].read()
+                text = data.decode(detect_encoding(data), errors='replace')
+            import_result = timetable.import_week(group, text, replace=bool(request.POST.get('replace')))
+        
+        elif action == 'add':
             day_of_week = request.POST.get('day_of_week')
             time = request.POST.get('time')
             subject = request.POST.get('subject')
@@ -64,15 +82,28 @@ def admin_schedule_group(request, group_id):
             schedule_id = request.POST.get('schedule_id')
             Schedule.objects.filter(id=schedule_id, group=group).delete()
         
-        return redirect('core:admin_schedule_group', group_id=group_id)
+        if import_result is None:
+            return redirect('core:admin_schedule_group', group_id=group_id)
     
+    conflicts = timetable.room_conflicts(group.id)
     return render(request, 'core/admin/schedule_group.html', {
         'group': group,
-        'schedules': schedules,
+        'schedules': content_cache.group_schedule(group.id),
+        'grid': timetable.group_grid(group.id),
+        'conflicts': conflicts,
+        'conflict_ids': timetable.conflicting_ids(conflicts),
+        'import_result': import_result,
         'day_choices': Schedule.DAY_CHOICES
     })
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_metrics(request):
+    """Метрики запросов по маршрутам (JSON, только этот процесс)"""
+    return JsonResponse(metrics.registry.snapshot())
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_panel(request):
@@ -82,8 +113,67 @@ def admin_panel(request):
 @login_required
 @user_passes_test(is_admin)
 def admin_users(request):
-    users = User.objects.all()
-    return render(request, 'core/admin/users.html', {'users': users})
+    """Каталог пользователей: фильтры и keyset-пагинация по логину"""
+    filters, page = _user_directory_page(request)
+    users, has_next, has_prev = page
+    params = {key: value for key, value in filters.items() if value}
+    return render(request, 'core/admin/users.html', {
+        'users': users,
+        'filters': filters,
+        'groups': StudyGroup.objects.order_by('name'),
+        'role_choices': User.ROLE_CHOICES,
+        'next_query': urlencode({**params, 'after': users[-1].username}) if has_next and users else None,
+        'prev_query': urlencode({**params, 'before': users[0].username}) if has_prev and users else None,
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_users_json(request):
+    """Каталог пользователей в JSON для постраничной подгрузки"""
+    filters, page = _user_directory_page(request)
+    users, has_next, _ = page
+    next_url = None
+    if has_next and users:
+        params = {key: value for key, value in filters.items() if value}
+        if request.GET.get('limit'):
+            params['limit'] = request.GET['limit']
+        next_url = reverse('core:admin_users_json') + '?' + urlencode({**params, 'after': users[-1].username})
+    return JsonResponse({'results': [user_directory.as_json(user) for user in users], 'next': next_url})
+
+
+def _user_directory_page(request):
+    filters = {
+        'role': request.GET.get('role', ''),
+        'group': request.GET.get('group', ''),
+        'q': request.GET.get('q', ''),
+    }
+    try:
+        limit = int(request.GET.get('limit', user_directory.PAGE_SIZE))
+    except ValueError:
+        limit = user_directory.PAGE_SIZE
+    page = user_directory.search_users(
+        role=filters['role'],
+        group_id=int(filters['group']) if filters['group'].isdigit() else None,
+        query=filters['q'],
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        limit=limit,
+    )
+    return filters, page
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_users_import(request):
+    """Импорт студентов и групп из CSV/XLSX"""
+    context = {}
+    if request.method == 'POST' and request.FILES.get('file'):
+        upload = request.FILES['file']
+        started = time.perf_counter()
+        context['result'] = import_students(upload, upload.name)
+        context['seconds'] = time.perf_counter() - started
+    return render(request, 'core/admin/users_import.html', context)
 
 
 @login_required
@@ -97,7 +187,7 @@ def admin_groups(request):
 @user_passes_test(is_admin)
 def admin_group_detail(request, group_id):
     group = get_object_or_404(StudyGroup, id=group_id)
-    subjects = group.subjects.all()
+    subjects = content_cache.group_tree(group.id)
     return render(request, 'core/admin/group_detail.html', {'group': group, 'subjects': subjects})
 
 
@@ -105,7 +195,7 @@ def admin_group_detail(request, group_id):
 @user_passes_test(is_admin)
 def admin_subject_detail(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id)
-    modules = subject.modules.all()
+    modules = content_cache.subject_modules(subject)
     return render(request, 'core/admin/subject_detail.html', {'subject': subject, 'modules': modules})
 
 
@@ -122,8 +212,59 @@ def admin_module_detail(request, module_id):
 @user_passes_test(is_admin)
 def admin_test_detail(request, test_id):
     test = get_object_or_404(Test, id=test_id)
-    questions = test.questions.all()
-    return render(request, 'core/admin/test_detail.html', {'test': test, 'questions': questions})
+    context = {'test': test}
+    if request.method == 'POST' and request.FILES.get('file'):
+        upload = request.FILES['file']
+        fmt = question_bank.format_for(upload.name, request.POST.get('format', 'aiken'))
+        try:
+            context['imported'] = question_bank.import_questions(
+                test, upload, fmt, replace=bool(request.POST.get('replace'))
+            )
+        except question_bank.QuestionBankError as exc:
+            context['import_error'] = str(exc)
+    context['questions'] = questions = list(test.questions.order_by('id').prefetch_related('choices'))
+    # Questions each export skips: numbered as on the page
+    for fmt in question_bank.FORMATS:
+        problems = [question_bank.export_problem(question, list(question.choices.all()), fmt) for question in questions]
+        context[f'{fmt}_skipped'] = [(number, problem) for number, problem in enumerate(problems, start=1) if problem]
+    return render(request, 'core/admin/test_detail.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_test_export(request, test_id):
+    """Выгрузка вопросов теста (Aiken или JSON), потоком"""
+    test = get_object_or_404(Test, id=test_id)
+    fmt = request.GET.get('format', 'aiken')
+    if fmt not in question_bank.FORMATS:
+        raise Http404('Неизвестный формат')
+    content_type = 'application/json' if fmt == 'json' else 'text/plain'
+    response = StreamingHttpResponse(
+        question_bank.export_questions(test, fmt), content_type=f'{content_type}; charset=utf-8'
+    )
+    extension = 'json' if fmt == 'json' else 'txt'
+    response['Content-Disposition'] = f'attachment; filename="test-{test.pk}.{extension}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_test_analysis(request, test_id):
+    """Анализ заданий теста по сохранённой статистике; POST — пересчитать по всем попыткам"""
+    test = get_object_or_404(Test, id=test_id)
+    if item_analysis.np is None:
+        return HttpResponse('Для анализа заданий установите numpy', status=501)
+    if request.method == 'POST':
+        item_analysis.refresh(test, full=True)
+        return redirect('core:admin_test_analysis', test_id=test.id)
+    stats, rows = item_analysis.report(test)
+    return render(request, 'core/admin/test_analysis.html', {
+        'test': test,
+        'stats': stats,
+        'rows': rows,
+        'outdated': stats is not None and stats.content_version != test.content_version,
+        'min_responses': item_analysis.MIN_RESPONSES,
+    })
 
 
 @login_required
@@ -147,75 +288,63 @@ def admin_journal_group_detail(request, group_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_journal_subject_detail(request, subject_id):
-    subject = get_object_or_404(Subject, id=subject_id)
+    subject = get_object_or_404(Subject.objects.select_related('group'), id=subject_id)
     
     # Get all test attempts for modules in this subject
     attempts = TestAttempt.objects.filter(
         test__module__subject=subject
     ).select_related('user', 'test', 'test__module').order_by('-created')
     
-    # Get all tests for this subject
-    tests = Test.objects.filter(module__subject=subject).order_by('module__name', 'name').distinct()
-    
-    # Get all students who took tests in this subject
-    students = User.objects.filter(
-        testattempt__test__module__subject=subject,
-        role='student'
-    ).distinct().order_by('first_name', 'last_name')
-    
-    # Build matrix: student -> test -> best score
-    matrix = {}
-    for student in students:
-        matrix[student.id] = {
-            'student': student,
-            'scores': {}
-        }
-        for test in tests:
-            # Get best score for this student on this test
-            best_attempt = TestAttempt.objects.filter(
-                user=student,
-                test=test
-            ).order_by('-score').first()
-            
-            matrix[student.id]['scores'][test.id] = {
-                'test': test,
-                'score': best_attempt.score if best_attempt else None,
-                'attempts': TestAttempt.objects.filter(user=student, test=test).count()
-            }
+    # Build matrix: student -> test -> best score (single aggregate query)
+    tests, matrix = subject_gradebook(subject)
     
     return render(request, 'core/admin/journal_subject_detail.html', {
         'subject': subject,
         'group': subject.group,
         'tests': tests,
-        'matrix': matrix.values(),
+        'matrix': matrix,
         'attempts': attempts
     })
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_journal_export(request, group_id=None, subject_id=None):
+    """Выгрузка журнала: предмет, группа или все группы. CSV идёт потоком, XLSX сначала целиком собирается во временный файл"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in gradebook_export.FORMATS:
+        raise Http404('Неизвестный формат')
+    if fmt == 'xlsx' and gradebook_export.openpyxl is None:
+        return HttpResponse('Для выгрузки XLSX установите openpyxl', status=501)
+    if subject_id is not None:
+        subject = get_object_or_404(Subject, id=subject_id)
+        return gradebook_export.export_response(fmt, f'journal-subject-{subject.id}', subject=subject)
+    if group_id is not None:
+        group = get_object_or_404(StudyGroup, id=group_id)
+        return gradebook_export.export_response(fmt, f'journal-group-{group.id}', group=group)
+    return gradebook_export.export_response(fmt, 'journal-all')
+
+
 @login_required
 def index(request):
     if request.user.role == 'admin':
         return render(request, 'core/admin_dashboard.html')
-    # Student: show subjects of their group + schedule
-    if request.user.study_group:
+    # Student: show subjects of their group + schedule (both cached per group)
+    if request.user.study_group_id:
         from .models import Schedule
-        subjects = request.user.study_group.subjects.all()
-        schedule = Schedule.objects.filter(group=request.user.study_group).order_by('day_of_week', 'time')
+        subjects = content_cache.group_tree(request.user.study_group_id)
+        grid = timetable.group_grid(request.user.study_group_id)
         return render(request, 'core/student_dashboard.html', {
             'subjects': subjects,
-            'schedule': schedule,
+            'grid': grid,
             'day_choices': Schedule.DAY_CHOICES
         })
-    return render(request, 'core/student_dashboard.html', {'subjects': [], 'schedule': [], 'day_choices': []})
+    return render(request, 'core/student_dashboard.html', {'subjects': [], 'grid': None, 'day_choices': []})
 
 
 @login_required
 def lectures_list(request):
-    user = request.user
-    if user.role == 'student' and user.study_group:
-        lectures = Lecture.objects.filter(assigned_groups=user.study_group)
-    else:
-        lectures = Lecture.objects.all()
+    lectures = Lecture.objects.visible_to(request.user).select_related('module__subject__group')
     return render(request, 'core/lectures_list.html', {'lectures': lectures})
 
 
@@ -223,7 +352,7 @@ def lectures_list(request):
 def subject_detail(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id)
     # Check permission for student
-    if request.user.role == 'student' and request.user.study_group != subject.group:
+    if not can_view(request.user, subject):
         return render(request, 'core/subject_detail.html', {'error': 'Доступ запрещён'})
     modules = subject.modules.all()
     return render(request, 'core/subject_detail.html', {'subject': subject, 'modules': modules})
@@ -231,116 +360,116 @@ def subject_detail(request, subject_id):
 
 @login_required
 def module_detail(request, module_id):
-    module = get_object_or_404(Module, id=module_id)
-    lectures = module.lectures.all()
-    tests = module.tests.all()
+    module = get_object_or_404(Module.objects.select_related('subject'), id=module_id)
+    if not can_view(request.user, module):
+        return render(request, 'core/module_detail.html', {'module': module, 'error': 'Доступ запрещён'})
+    lectures, tests = content_cache.module_content(module, request.user)
     return render(request, 'core/module_detail.html', {'module': module, 'lectures': lectures, 'tests': tests})
 
 
 @login_required
 def student_journal(request):
-    # Get all test attempts for current student grouped by subject
     user = request.user
     if user.role != 'student':
         return render(request, 'core/student_journal.html', {'error': 'Доступ запрещён'})
-    
-    attempts = TestAttempt.objects.filter(user=user).select_related('test__module__subject').order_by('-created')
-    
-    # Group by subject with average score and max score
-    subjects_data = {}
-    for attempt in attempts:
-        subject = attempt.test.module.subject
-        if subject is None:  # Skip if subject is not set
-            continue
-        if subject.id not in subjects_data:
-            subjects_data[subject.id] = {
-                'subject': subject,
-                'attempts': [],
-                'total_score': 0,
-                'max_score': 0,
-                'count': 0
-            }
-        subjects_data[subject.id]['attempts'].append(attempt)
-        subjects_data[subject.id]['total_score'] += attempt.score
-        subjects_data[subject.id]['max_score'] = max(subjects_data[subject.id]['max_score'], attempt.score)
-        subjects_data[subject.id]['count'] += 1
-    
-    # Calculate average for each subject
-    for data in subjects_data.values():
-        data['average'] = data['total_score'] / data['count'] if data['count'] > 0 else 0
-    
-    return render(request, 'core/student_journal.html', {'subjects_data': subjects_data.values()})
+
+    # Per-subject totals are aggregated in the database; only the latest
+    # attempts of each subject are loaded, the rest is paged on demand
+    return render(request, 'core/student_journal.html', {'subjects_data': journal.student_subjects(user)})
+
+
+@login_required
+def student_journal_subject(request, subject_id):
+    """История попыток студента по предмету, постранично"""
+    user = request.user
+    subject = get_object_or_404(Subject, id=subject_id)
+    if user.role != 'student':
+        return render(request, 'core/student_journal_subject.html', {'subject': subject, 'error': 'Доступ запрещён'})
+    after = request.GET.get('after')
+    attempts, has_next = journal.subject_history(user, subject.id, after=int(after) if after and after.isdigit() else None)
+    # The history is the student's own attempts, also from a group they have
+    # since left; a subject without any is not theirs to look at
+    if not attempts and not TestAttempt.objects.filter(user=user, test__module__subject=subject).exists():
+        raise Http404('Нет попыток по предмету')
+    return render(request, 'core/student_journal_subject.html', {
+        'subject': subject,
+        'attempts': attempts,
+        'next_after': attempts[-1].id if has_next else None,
+        'is_first_page': not after,
+    })
 
 
 @login_required
 def lecture_detail(request, pk):
     lecture = get_object_or_404(Lecture, pk=pk)
-    if request.user.role == 'student' and request.user.study_group not in lecture.assigned_groups.all():
+    if not can_view(request.user, lecture):
         return render(request, 'core/lecture_detail.html', {'error': 'Доступ запрещён'})
 
-    content = None
-    ext = lecture.file_ext
-    file_url = lecture.file.url
-    if ext == 'md':
-        path = os.path.join(settings.MEDIA_ROOT, lecture.file.name)
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            content = md.markdown(text)
-        except Exception:
-            content = '<p>Не удалось загрузить Markdown.</p>'
-    elif ext == 'docx' and mammoth:
-        path = os.path.join(settings.MEDIA_ROOT, lecture.file.name)
-        try:
-            with open(path, 'rb') as f:
-                res = mammoth.convert_to_html(f)
-                content = res.value
-        except Exception:
-            content = '<p>Не удалось конвертировать DOCX.</p>'
+    # While a background render is pending, show only what is already cached
+    pending = is_pending(lecture)
+    content = cached_html(lecture) if pending else render_lecture(lecture)
+    file_url = reverse('core:lecture_file', args=[lecture.pk])
+
+    return render(request, 'core/lecture_detail.html', {
+        'lecture': lecture,
+        'content': content,
+        'file_url': file_url,
+        'pending': pending and content is None,
+    })
 
-    return render(request, 'core/lecture_detail.html', {'lecture': lecture, 'content': content, 'file_url': file_url})
+
+@login_required
+def lecture_file(request, pk):
+    """Файл лекции: проверка доступа, потоковая отдача и HTTP Range"""
+    lecture = get_object_or_404(Lecture, pk=pk)
+    if not can_view(request.user, lecture):
+        return HttpResponseForbidden('Доступ запрещён')
+    path = os.path.join(settings.MEDIA_ROOT, lecture.file.name)
+    if not lecture.file.name or not os.path.isfile(path):
+        raise Http404('Файл лекции не найден')
+    return serve_file(request, path, lecture.file.name)
 
 
 @login_required
 def take_test(request, test_id):
     test = get_object_or_404(Test, id=test_id)
-    
-    # Check if student exceeded attempt limit
-    user_attempts = TestAttempt.objects.filter(user=request.user, test=test).count()
-    if user_attempts >= test.attempts_limit:
-        return render(request, 'core/take_test.html', {
-            'test': test,
-            'error': f'Вы исчерпали максимальное количество попыток ({test.attempts_limit}). Последний результат: {TestAttempt.objects.filter(user=request.user, test=test).latest("created").score:.1f}%'
-        })
+    if not can_view(request.user, test):
+        return render(request, 'core/take_test.html', {'test': test, 'error': 'Доступ запрещён'})
     
     if request.method == 'POST':
-        total = 0
-        correct = 0
-        for q in test.questions.all():
-            total += 1
-            choice_id = request.POST.get(f'question_{q.id}')
-            if choice_id:
-                try:
-                    c = Choice.objects.get(id=int(choice_id))
-                    if c.correct:
-                        correct += 1
-                except Choice.DoesNotExist:
-                    pass
-        score = (correct / total) * 100 if total else 0
-        TestAttempt.objects.create(user=request.user, test=test, score=score)
-        
-        # Check if this was last attempt
-        remaining = test.attempts_limit - (user_attempts + 1)
+        graded = grade_submission(test, request.POST)
+        score = graded['score']
+        # Limit check and insert are one atomic step: parallel submissions
+        # (double click, two tabs) cannot both take the last attempt
+        reservation = reserve_attempt(request.user, test, score, answers=graded['answers'])
+        if not reservation['accepted']:
+            return _attempts_exhausted(request, test, reservation['last_score'])
         
         return render(request, 'core/take_result.html', {
             'score': score,
             'test': test,
-            'attempts_left': remaining,
+            'attempts_left': reservation['remaining'],
             'attempts_limit': test.attempts_limit
         })
 
+    # Check if student exceeded attempt limit
+    result = TestResult.objects.filter(user=request.user, test=test).first()
+    user_attempts = result.attempts if result else 0
+    if user_attempts >= test.attempts_limit:
+        return _attempts_exhausted(request, test, result.last_score if result else 0)
+
+    # Lazy queryset: only evaluated when the cached question sheet is missing
+    questions = test.questions.order_by('id').prefetch_related('choices')
     return render(request, 'core/take_test.html', {
         'test': test,
+        'questions': questions,
         'attempts_left': test.attempts_limit - user_attempts,
         'attempts_limit': test.attempts_limit
     })
+
+
+def _attempts_exhausted(request, test, last_score):
+    return render(request, 'core/take_test.html', {
+        'test': test,
+        'error': f'Вы исчерпали максимальное количество попыток ({test.attempts_limit}). Последний результат: {last_score:.1f}%'
+    })
@@ -0,0 +1,215 @@
+"""
+HTTP load test for a running mik_edu server or for run_prod.py configurations.
+
+    python loadtest.py --url http://127.0.0.1:8000 --user s1 --password x
+    python loadtest.py --user s1 --password x \
+        --config "--threads 4" --config "--threads 16" --config "--threads 8 --workers 4"
+
+With --config the script starts run_prod.py with each set of arguments on
+--port, measures it and stops it with SIGTERM, then prints a comparison.
+--asgi-config does the same with run_asgi.py, so WSGI and ASGI can be compared
+at the same concurrency:
+
+    python loadtest.py --user s1 --password x --concurrency 64 \
+        --path / --path /lectures/ --path /student-journal/ \
+        --config "--threads 8" --asgi-config ""
+"""
+import argparse
+import http.client
+import os
+import re
+import shlex
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Session:
+    """Куки, общие для всех потоков (после входа они не меняются)."""
+
+    def __init__(self):
+        self.cookies = {}
+
+    def header(self):
+        return '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+
+    def update(self, response):
+        for value in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(value).items():
+                self.cookies[name] = morsel.value
+
+
+def connect(base):
+    parts = urlsplit(base)
+    conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return conn_class(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80), timeout=30)
+
+
+def login(base, session, username, password):
+    conn = connect(base)
+    conn.request('GET', '/login/')
+    response = conn.getresponse()
+    body = response.read().decode('utf-8', 'replace')
+    session.update(response)
+    match = CSRF_RE.search(body)
+    if not match:
+        raise SystemExit('Login page has no CSRF token')
+    data = urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': match.group(1)})
+    conn.request('POST', '/login/', body=data, headers={
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Cookie': session.header(),
+        'Referer': base.rstrip('/') + '/login/',
+    })
+    response = conn.getresponse()
+    response.read()
+    session.update(response)
+    conn.close()
+    if response.status != 302:
+        raise SystemExit(f'Login failed for {username!r} (HTTP {response.status})')
+
+
+def worker(base, paths, session, deadline, results, offset):
+    conn = connect(base)
+    latencies, errors, statuses = [], 0, {}
+    i = offset
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Cookie': session.header()})
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = connect(base)
+            continue
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.will_close:
+            conn.close()
+            conn = connect(base)
+    conn.close()
+    results.append((latencies, errors, statuses))
+
+
+def measure(base, paths, session, concurrency, duration):
+    results = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=worker, args=(base, paths, session, deadline, results, n))
+        for n in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(x for r in results for x in r[0])
+    statuses = {}
+    for _, _, counts in results:
+        for code, n in counts.items():
+            statuses[code] = statuses.get(code, 0) + n
+    if not latencies:
+        return {'requests': 0, 'rps': 0, 'p50': 0, 'p95': 0, 'p99': 0,
+                'errors': sum(r[1] for r in results), 'statuses': statuses}
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'mean': statistics.mean(latencies) * 1000,
+        'p50': pct(0.5),
+        'p95': pct(0.95),
+        'p99': pct(0.99),
+        'errors': sum(r[1] for r in results),
+        'statuses': statuses,
+    }
+
+
+def wait_ready(base, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{process.args[1]} exited with code {process.returncode}')
+        try:
+            conn = connect(base)
+            conn.request('GET', '/login/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('Server did not start in time')
+
+
+def run_case(args, base, label):
+    session = Session()
+    if args.user:
+        login(base, session, args.user, args.password)
+    if args.warmup:
+        measure(base, args.paths, session, args.concurrency, args.warmup)
+    row = measure(base, args.paths, session, args.concurrency, args.duration)
+    row['label'] = label
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест mik_edu')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес уже запущенного сервера')
+    parser.add_argument('--path', dest='paths', action='append', help='Путь для запросов (можно несколько)')
+    parser.add_argument('--user', help='Войти под этим пользователем')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--concurrency', type=int, default=16, help='Одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=10, help='Секунд на замер')
+    parser.add_argument('--warmup', type=float, default=2, help='Секунд прогрева перед замером')
+    parser.add_argument('--config', action='append', default=[],
+                        help='Аргументы run_prod.py; сервер запускается для каждого набора')
+    parser.add_argument('--asgi-config', action='append', default=[],
+                        help='Аргументы run_asgi.py; сервер запускается для каждого набора')
+    parser.add_argument('--port', type=int, default=8765, help='Порт для серверов из --config')
+    args = parser.parse_args(argv)
+    args.paths = args.paths or ['/', '/lectures/']
+
+    servers = [('run_prod.py', 'wsgi', config) for config in args.config]
+    servers += [('run_asgi.py', 'asgi', config) for config in args.asgi_config]
+    rows = []
+    if not servers:
+        rows.append(run_case(args, args.url, args.url))
+    for script, mode, config in servers:
+        base = f'http://127.0.0.1:{args.port}'
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), script),
+                   '--host', '127.0.0.1', '--port', str(args.port), *shlex.split(config)]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        try:
+            wait_ready(base, process)
+            rows.append(run_case(args, base, f'{mode} {config}'.strip()))
+        finally:
+            process.send_signal(signal.SIGTERM if hasattr(signal, 'SIGTERM') else signal.SIGINT)
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print(f"{'config':<40} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  statuses")
+    for row in rows:
+        print(
+            f"{row['label'][:40]:<40} {row['rps']:>9.1f} {row.get('mean', 0):>9.1f} {row['p50']:>9.1f} "
+            f"{row['p95']:>9.1f} {row['p99']:>9.1f} {row['errors']:>7}  {row['statuses']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mik_edu.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'ASGI_SERVE_STATIC', False):
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    from django.views.static import serve
+
+    class StaticRootHandler(ASGIStaticFilesHandler):
+        # Serve collected (hashed) files from STATIC_ROOT, as WhiteNoise does
+        def serve(self, request):
+            return serve(request, self.file_path(request.path), document_root=settings.STATIC_ROOT)
+
+    application = StaticRootHandler(application)
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -36,7 +37,8 @@ ROOT_URLCONF = 'mik_edu.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for core.metrics
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -56,9 +58,26 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep per-thread connections open between requests under Waitress
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds to wait for a competing writer before "database is locked"
+            'timeout': 20,
+            # Writers take the lock at BEGIN through core.db.serialized_write
+            # (BEGIN IMMEDIATE); other atomic() blocks, read-only ones
+            # included, stay DEFERRED
+        },
+        # File test database: the concurrency tests need real SQLite locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# PRAGMAs applied to every new SQLite connection (see core/db.py); overrides
+# merge into core.db.DEFAULT_SQLITE_PRAGMAS. SQLITE_TUNING = False disables them.
+SQLITE_TUNING = True
+SQLITE_PRAGMAS = {}
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'ru'
@@ -81,6 +100,37 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Lecture files are served by core:lecture_file after an access check.
+# Behind nginx set 'x-accel-redirect' (internal location LECTURE_FILE_ACCEL_PREFIX
+# aliased to MEDIA_ROOT); behind Apache/lighttpd use 'x-sendfile'.
+LECTURE_FILE_SENDFILE = None
+LECTURE_FILE_ACCEL_PREFIX = '/protected-media/'
+
+# Rendered Markdown/DOCX lectures: on-disk cache plus an in-process LRU (bytes)
+LECTURE_RENDER_CACHE_DIR = BASE_DIR / 'cache' / 'lectures'
+LECTURE_RENDER_MEMORY_BYTES = 32 * 1024 * 1024
+
+# Background conversion of uploaded lectures (in-process thread pool)
+LECTURE_RENDER_ASYNC = True
+LECTURE_RENDER_WORKERS = 2
+# A job pending longer than this is treated as lost and rendered inline
+LECTURE_RENDER_STALE_SECONDS = 300
+
+# Worker processes serving the site; run_prod.py and run_asgi.py set it from
+# --workers. A per-process (LocMem) cache is refused when there are several:
+# content cache versions bumped in one process would not reach the others.
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 1))
+
+# Per-view request metrics (core.metrics): Server-Timing header for staff and
+# administrators (False disables it), rolling window of the last
+# METRICS_WINDOW requests per URL name (admin-metrics/), and a
+# warning with the slowest METRICS_SLOW_SQL statements for requests over
+# METRICS_SLOW_MS (None disables the log)
+METRICS_SERVER_TIMING = True
+METRICS_WINDOW = 1000
+METRICS_SLOW_MS = 500
+METRICS_SLOW_SQL = 5
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
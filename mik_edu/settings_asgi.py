@@ -0,0 +1,22 @@
+"""
+ASGI profile: DJANGO_SETTINGS_MODULE=mik_edu.settings_asgi (run_asgi.py
+selects it by default). Production settings plus the async URLconf.
+"""
+import os
+
+from .settings_prod import *  # noqa: F401,F403
+from .settings_prod import DATABASES, MIDDLEWARE
+
+ROOT_URLCONF = 'mik_edu.urls_asgi'
+
+# WhiteNoise is sync-only and would force every request through a thread
+# hop; static files are served by the ASGI handler in mik_edu/asgi.py
+MIDDLEWARE = [name for name in MIDDLEWARE if name != 'whitenoise.middleware.WhiteNoiseMiddleware']
+ASGI_SERVE_STATIC = True
+
+# Async ORM calls run in a thread that is not tied to one request, so
+# persistent connections are not closed reliably
+DATABASES = {alias: {**config, 'CONN_MAX_AGE': 0} for alias, config in DATABASES.items()}
+
+# Threads for lecture file reads and HTML conversion (core.async_views)
+ASYNC_FILE_WORKERS = int(os.environ.get('ASYNC_FILE_WORKERS', 4))
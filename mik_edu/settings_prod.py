@@ -0,0 +1,85 @@
+"""
+Production profile: DJANGO_SETTINGS_MODULE=mik_edu.settings_prod (run_prod.py
+selects it by default). Values are read from the environment.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.utils import get_random_secret_key
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, TEMPLATES
+
+
+def env_list(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def secret_key():
+    # Signed-cookie sessions need a stable key: DJANGO_SECRET_KEY, or one
+    # generated on first start and kept next to the database
+    key = os.environ.get('DJANGO_SECRET_KEY')
+    if key:
+        return key
+    path = BASE_DIR / 'secret_key.txt'
+    if not path.exists():
+        path.write_text(get_random_secret_key(), encoding='utf-8')
+    key = path.read_text(encoding='utf-8').strip()
+    if not key:
+        raise ImproperlyConfigured(f'{path} is empty; set DJANGO_SECRET_KEY')
+    return key
+
+
+DEBUG = os.environ.get('DJANGO_DEBUG', '') == '1'
+
+SECRET_KEY = secret_key()
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', ['127.0.0.1', 'localhost', '*'])
+CSRF_TRUSTED_ORIGINS = env_list('DJANGO_CSRF_TRUSTED_ORIGINS', [])
+
+# Templates are compiled once per process
+TEMPLATES = [{**TEMPLATES[0], 'APP_DIRS': False}]
+TEMPLATES[0]['OPTIONS'] = {
+    **TEMPLATES[0]['OPTIONS'],
+    'loaders': [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ],
+}
+
+# File-based cache is shared by every worker process on the host;
+# DJANGO_CACHE=locmem keeps it per process (single-process deployments only,
+# the core.E001 check refuses it with SERVER_WORKERS > 1)
+if os.environ.get('DJANGO_CACHE', 'file') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mik-edu',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', str(BASE_DIR / 'cache' / 'django')),
+            'TIMEOUT': 60 * 60 * 24,
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+# No sessions-table write per request. DJANGO_SESSIONS=cache keeps session
+# data server-side in the cache above instead of in the signed cookie.
+if os.environ.get('DJANGO_SESSIONS', 'cookies') == 'cache':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+SESSION_COOKIE_HTTPONLY = True
+
+SESSION_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES', '') == '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
@@ -0,0 +1,91 @@
+"""
+ASGI launcher: uvicorn with the async views of core.urls_async.
+
+Every option can also be set through the UVICORN_* environment variable
+shown in --help. Needs `pip install uvicorn`.
+"""
+import argparse
+import os
+import sys
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mik_edu.settings_asgi')
+
+try:
+    import uvicorn
+except Exception:
+    uvicorn = None
+
+OPTIONS = [
+    # name, type, default, help
+    ('host', str, '0.0.0.0', 'Адрес для прослушивания'),
+    ('port', int, 8000, 'Порт'),
+    ('workers', int, 1, 'Процессов-обработчиков'),
+    ('limit_concurrency', int, 1000, 'Максимум одновременных соединений/задач на процесс (дальше 503)'),
+    ('backlog', int, 1024, 'Очередь listen() для ещё не принятых соединений'),
+    ('timeout_keep_alive', int, 60, 'Закрывать неактивные keep-alive соединения через N секунд'),
+    ('file_workers', int, 4, 'Потоков для чтения и конвертации лекций (ASYNC_FILE_WORKERS)'),
+    ('grace', int, 30, 'Сколько секунд дожидаться текущих запросов при остановке'),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Запуск mik_edu под uvicorn (ASGI)')
+    for name, kind, default, help_text in OPTIONS:
+        env_name = f'UVICORN_{name.upper()}'
+        parser.add_argument(
+            '--' + name.replace('_', '-'),
+            type=kind,
+            default=kind(os.environ.get(env_name, default)),
+            help=f'{help_text} [{env_name}, {default}]',
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if uvicorn is None:
+        sys.exit('uvicorn is not installed: pip install uvicorn (or use run_prod.py)')
+
+    # Read by core.async_views when the application is imported, including
+    # in uvicorn's worker processes. ORM and template calls go through
+    # thread-sensitive sync_to_async, i.e. one thread per process; only
+    # file reads and conversion have a pool of their own.
+    os.environ['ASYNC_FILE_WORKERS'] = str(args.file_workers)
+    # Read by the settings (core.E001 refuses a per-process cache)
+    os.environ['SERVER_WORKERS'] = str(args.workers)
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.core.management.base import SystemCheckError
+
+    from core.checks import format_report, performance_report
+
+    try:
+        call_command('check')
+    except SystemCheckError as exc:
+        sys.exit(str(exc))
+    print(format_report(performance_report()), flush=True)
+    print(
+        f'Serving on http://{args.host}:{args.port} with {args.workers} process(es), '
+        f'limit_concurrency={args.limit_concurrency}, backlog={args.backlog}, '
+        f'timeout_keep_alive={args.timeout_keep_alive}s',
+        flush=True,
+    )
+    uvicorn.run(
+        'mik_edu.asgi:application',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_concurrency=args.limit_concurrency,
+        backlog=args.backlog,
+        timeout_keep_alive=args.timeout_keep_alive,
+        timeout_graceful_shutdown=args.grace,
+        # Django does not implement the lifespan protocol
+        lifespan='off',
+        access_log=False,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,199 @@
-from waitress import serve
-from mik_edu.wsgi import application
+"""
+Production launcher: Waitress with tunable threads/connections and optional
+pre-forked worker processes sharing one listening socket.
+
+Every option can also be set through the WAITRESS_* environment variable
+shown in --help.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mik_edu.settings_prod')
+
+from django.db import connections  # noqa: E402
+from waitress.server import create_server  # noqa: E402
+
+OPTIONS = [
+    # name, type, default, help
+    ('host', str, '0.0.0.0', 'Адрес для прослушивания'),
+    ('port', int, 8000, 'Порт'),
+    ('threads', int, 8, 'Потоков-обработчиков на процесс'),
+    ('connection_limit', int, 200, 'Максимум открытых соединений на процесс'),
+    ('backlog', int, 1024, 'Очередь listen() для ещё не принятых соединений'),
+    ('channel_timeout', int, 60, 'Закрывать неактивные keep-alive соединения через N секунд'),
+    ('recv_bytes', int, 65536, 'Размер буфера recv()'),
+    ('send_bytes', int, 0, 'SO_SNDBUF принятых соединений, байт (0 — по умолчанию ОС)'),
+    ('workers', int, 1, 'Процессов-обработчиков (fork, только POSIX)'),
+    ('grace', float, 30, 'Сколько секунд дожидаться текущих запросов при остановке'),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Запуск mik_edu под Waitress')
+    for name, kind, default, help_text in OPTIONS:
+        env_name = f'WAITRESS_{name.upper()}'
+        parser.add_argument(
+            '--' + name.replace('_', '-'),
+            type=kind,
+            default=kind(os.environ.get(env_name, default)),
+            help=f'{help_text} [{env_name}, {default}]',
+        )
+    return parser.parse_args(argv)
+
+
+def create(application, sock, args):
+    server = create_server(
+        application,
+        sockets=[sock],
+        threads=args.threads,
+        connection_limit=args.connection_limit,
+        backlog=args.backlog,
+        channel_timeout=args.channel_timeout,
+        recv_bytes=args.recv_bytes,
+    )
+    if args.send_bytes:
+        # Waitress' own send_bytes is deprecated; size the kernel buffer of
+        # accepted connections instead (not a constructor argument)
+        server.adj.socket_options = [
+            *server.adj.socket_options,
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, args.send_bytes),
+        ]
+    return server
+
+
+def listen_socket(args):
+    family = socket.AF_INET6 if ':' in args.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def serve(application, sock, args):
+    """Обслуживать запросы до SIGTERM/SIGINT, затем дождаться текущих."""
+    server = create(application, sock, args)
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        server.pull_trigger()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    loop = server.asyncore.loop
+    while not stopping:
+        loop(timeout=1, map=server._map, use_poll=server.adj.asyncore_use_poll, count=1)
+
+    # Stop accepting, close idle keep-alive connections, finish in-flight requests
+    server.accepting = False
+    deadline = time.monotonic() + args.grace
+    while time.monotonic() < deadline:
+        busy = False
+        for channel in list(server.active_channels.values()):
+            if channel.requests or channel.total_outbufs_len:
+                busy = True
+            else:
+                channel.will_close = True
+        if not busy:
+            break
+        loop(timeout=0.1, map=server._map, use_poll=server.adj.asyncore_use_poll, count=1)
+    server.task_dispatcher.shutdown(cancel_pending=True, timeout=max(deadline - time.monotonic(), 0))
+    connections.close_all()
+
+
+def run_workers(application, sock, args):
+    """Родитель: держит N дочерних процессов, пересоздаёт упавшие, останавливает по сигналу."""
+    # Children must open their own database connections
+    connections.close_all()
+    children = {}
+    stopping = []
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                serve(application, sock, args)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f'Worker {pid} exited with status {status}, restarting', file=sys.stderr, flush=True)
+        if time.monotonic() - started < 1:
+            # Crashing on startup: don't spin
+            time.sleep(1)
+        spawn()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers > 1 and not hasattr(os, 'fork'):
+        print('Pre-fork is not available on this platform, running a single process', file=sys.stderr)
+        args.workers = 1
+    # Read by the settings (core.E001 refuses a per-process cache)
+    os.environ['SERVER_WORKERS'] = str(args.workers)
+
+    from django.core.management import call_command
+    from django.core.management.base import SystemCheckError
+
+    from core.checks import format_report, performance_report
+    from mik_edu.wsgi import application
+
+    try:
+        call_command('check')
+    except SystemCheckError as exc:
+        sys.exit(str(exc))
+    print(format_report(performance_report()), flush=True)
+
+    sock = listen_socket(args)
+    print(
+        f'Serving on http://{args.host}:{args.port} with {args.workers} process(es) x {args.threads} threads, '
+        f'connection_limit={args.connection_limit}, backlog={args.backlog}, '
+        f'channel_timeout={args.channel_timeout}s',
+        flush=True,
+    )
+    if args.workers > 1:
+        run_workers(application, sock, args)
+    else:
+        serve(application, sock, args)
+    sock.close()
+
 
 if __name__ == '__main__':
-    serve(application, host='0.0.0.0', port=8000)
+    main()